@@ -1,11 +1,138 @@
 """Functions related to rock-paper-scissors classification."""
 
+from collections import namedtuple
+
 import numpy as np
-from scipy.spatial.distance import euclidean
+
+Landmark = namedtuple('Landmark', ['x', 'y', 'z'])
+
+
+def landmarks_to_array(landmark_list):
+    """Turns a list of 21 Mediapipe landmarks into a (21, 3) float32 array of xyz coordinates."""
+    return np.array([(lm.x, lm.y, lm.z) for lm in landmark_list], dtype=np.float32)
+
+
+def array_to_landmarks(landmark_array):
+    """Turns a (21, 3) array back into Mediapipe-like landmarks with x, y and z attributes."""
+    return [Landmark(*map(float, point)) for point in landmark_array]
+
+
+# (fingertip, knuckle, finger base) landmark indices of the index, middle, ring and pink finger
+FINGER_JOINTS = np.array([
+    (8, 6, 5),
+    (12, 10, 9),
+    (16, 14, 13),
+    (20, 18, 17),
+])
+
+
+def joint_angles(landmarks, joints):
+    """Angles in degrees at the middle landmark of every (a, b, c) triple in joints, of many hands at once."""
+    landmarks = np.asarray(landmarks, dtype=np.float64)
+    tips = landmarks[..., joints[:, 0], :]
+    knuckles = landmarks[..., joints[:, 1], :]
+    bases = landmarks[..., joints[:, 2], :]
+    ba = tips - knuckles
+    bc = bases - knuckles
+
+    cosine_angle = np.einsum('...i,...i->...', ba, bc) / (np.linalg.norm(ba, axis=-1) * np.linalg.norm(bc, axis=-1))
+    return np.degrees(np.arccos(np.clip(cosine_angle, -1, 1)))
+
+
+def finger_angles(landmarks):
+    """Vectorized version of AngleClassifier.calc_angle for every finger of many hands at once.
+
+    Args:
+        landmarks (np.ndarray): Landmark arrays of shape (..., 21, 3).
+
+    Returns:
+        np.ndarray: Knuckle angles in degrees of shape (..., 4) (index, middle, ring, pink).
+    """
+    return joint_angles(landmarks, FINGER_JOINTS)
+
+
+def top_bottom_angles(landmarks):
+    """Returns the average top (index, middle) and bottom (ring, pink) finger angles of many hands."""
+    angles = finger_angles(landmarks)
+    return angles[..., :2].mean(axis=-1), angles[..., 2:].mean(axis=-1)
+
+
+# (fingertip, finger base) landmark indices of the thumb, index, middle, ring and pink finger
+FINGER_TIPS = np.array([(4, 2), (8, 5), (12, 9), (16, 13), (20, 17)])
+THUMB_JOINTS = np.array([(4, 3, 2)])
+N_FEATURES = 15
+
+
+def landmark_features(landmarks, angles=None):
+    """Features of many hands that don't change when a hand is moved, rotated or scaled.
+
+    Args:
+        landmarks (np.ndarray): Landmark arrays of shape (..., 21, 3).
+        angles (np.ndarray, optional): Their finger_angles, when already computed.
+
+    Returns:
+        np.ndarray: Features of shape (..., 15): the 4 knuckle angles and the thumb angle (in units of
+            180 degrees), and per finger the fingertip-to-wrist and fingertip-to-base distances (in palm lengths).
+    """
+    landmarks = np.asarray(landmarks, dtype=np.float64)
+    wrist = landmarks[..., 0:1, :]
+    palm = np.linalg.norm(landmarks[..., 9, :] - landmarks[..., 0, :], axis=-1)[..., None]
+    tips = landmarks[..., FINGER_TIPS[:, 0], :]
+    tip_wrist = np.linalg.norm(tips - wrist, axis=-1) / palm
+    tip_base = np.linalg.norm(tips - landmarks[..., FINGER_TIPS[:, 1], :], axis=-1) / palm
+    if angles is None:
+        angles = finger_angles(landmarks)
+    angles = np.concatenate([angles, joint_angles(landmarks, THUMB_JOINTS)], axis=-1) / 180
+    return np.concatenate([angles, tip_wrist, tip_base], axis=-1)
+
+
+class HandFeatures:
+    """
+    The features of one detected hand, each computed the first time a classifier asks for it,
+    so classifiers that run on the same hand (see helpers/classifier_ensemble.py) share them.
+
+    Args:
+        landmark_array: Mediapipe landmark detections, or a (21, 3) array of them.
+        finger_angles (np.ndarray, optional): The knuckle angles, when already known.
+    """
+
+    def __init__(self, landmark_array, finger_angles=None):
+        if isinstance(landmark_array, np.ndarray):
+            self.landmarks = landmark_array
+        else:
+            self.landmarks = landmarks_to_array(landmark_array)
+        self._finger_angles = finger_angles
+        self._palm_distances = None
+        self._features = None
+
+    @property
+    def finger_angles(self):
+        """Knuckle angles in degrees (index, middle, ring, pink)."""
+        if self._finger_angles is None:
+            self._finger_angles = finger_angles(self.landmarks)
+        return self._finger_angles
+
+    @property
+    def palm_distances(self):
+        """Distances of the fingertips and of the finger bases to the wrist, shape (2, 4) (index, middle, ring, pink)."""
+        if self._palm_distances is None:
+            points = self.landmarks[FINGER_TIPS[1:].T] - self.landmarks[0]
+            self._palm_distances = np.linalg.norm(points, axis=-1)
+        return self._palm_distances
+
+    @property
+    def features(self):
+        """landmark_features of the hand."""
+        if self._features is None:
+            self._features = landmark_features(self.landmarks, self.finger_angles)
+        return self._features
+
 
 class AngleClassifier:
-    def __init__(self, angle_cutoff=90):
+    def __init__(self, angle_cutoff=90, bottom_angle_cutoff=None):
         self.angle_cutoff=angle_cutoff
+        # Ring and pink finger cutoff, defaults to the same cutoff as the top fingers
+        self.bottom_angle_cutoff=angle_cutoff if bottom_angle_cutoff is None else bottom_angle_cutoff
 
     def arrayify(self, landmark_element):
         """Turns a Mediapipe landmark into an array of its coordinates on the xyz-plane."""
@@ -40,7 +167,7 @@ class AngleClassifier:
         to get rockiness, paperiness and scissoriness scores that add up to 100%."""
 
         top_extendedness = top_fingers_angle - self.angle_cutoff
-        bottom_extendedness= bottom_fingers_angle - self.angle_cutoff
+        bottom_extendedness= bottom_fingers_angle - self.bottom_angle_cutoff
 
         rockiness = -1 * (top_extendedness + bottom_extendedness)
         paperiness = top_extendedness + bottom_extendedness
@@ -48,6 +175,35 @@ class AngleClassifier:
 
         return rockiness, paperiness, scissoriness
 
+    def margin(self, rockiness, paperiness, scissoriness):
+        """How sure a prediction is: the distance (degrees) of the nearest finger group to its cutoff,
+        recovered from the calc_scores output."""
+        top_extendedness = (paperiness + scissoriness) / 2
+        bottom_extendedness = (paperiness - scissoriness) / 2
+        return min(abs(top_extendedness), abs(bottom_extendedness))
+
+    def classify_angles(self, top_fingers_angle, bottom_fingers_angle):
+        """Rock, paper or scissors from the average top and bottom finger angles."""
+        # Are fingers extended or unextended?
+        top_extended = top_fingers_angle >= self.angle_cutoff
+        bottom_extended = bottom_fingers_angle >= self.bottom_angle_cutoff
+
+        if top_extended and bottom_extended:
+            return 'paper'
+        elif top_extended or bottom_extended:
+            return 'scissors'
+        else:
+            return 'rock'
+
+    def predict_hand(self, hand):
+        """Same as predict, on HandFeatures."""
+        angles = hand.finger_angles
+        top_fingers_angle = float(angles[:2].mean())
+        bottom_fingers_angle = float(angles[2:].mean())
+        pred = self.classify_angles(top_fingers_angle, bottom_fingers_angle)
+        rockiness, paperiness, scissoriness = self.calc_scores(top_fingers_angle, bottom_fingers_angle)
+        return top_fingers_angle, bottom_fingers_angle, pred, rockiness, paperiness, scissoriness
+
     def predict(self, landmark_array):
         """Will make a rock, paper or scissors classification based on the angle that fingers make.
 
@@ -87,16 +243,7 @@ class AngleClassifier:
 
         bottom_fingers_angle = (ring_angle + pink_angle) / 2
 
-        # Are fingers extended or unextended?
-        top_extended = top_fingers_angle >= self.angle_cutoff
-        bottom_extended = bottom_fingers_angle >= self.angle_cutoff
-
-        if top_extended and bottom_extended:
-            pred = 'paper'
-        elif top_extended or bottom_extended:
-            pred = 'scissors'
-        else:
-            pred = 'rock'
+        pred = self.classify_angles(top_fingers_angle, bottom_fingers_angle)
 
         rockiness, paperiness, scissoriness = self.calc_scores(
                                                 top_fingers_angle,
@@ -111,8 +258,8 @@ class DistanceClassifier:
 
     def calc_distances(self, tip, base, palm):
         """Calculates distances from the fingertip to the palm and from the finger base to the palm."""
-        dist_tip_palm = euclidean(tip, palm)
-        dist_base_palm = euclidean(base, palm)
+        dist_tip_palm = np.linalg.norm(tip - palm)
+        dist_base_palm = np.linalg.norm(base - palm)
         return dist_tip_palm, dist_base_palm
 
     def isextended(self, finger1, finger2, palm):
@@ -127,6 +274,26 @@ class DistanceClassifier:
 
         return avg_diff > 0
 
+    def margin(self, rockiness, paperiness, scissoriness):
+        """The distance rule has no notion of how sure it is: every prediction counts."""
+        return float('inf')
+
+    def predict_hand(self, hand):
+        """Same as predict, on HandFeatures."""
+        tips, bases = hand.palm_distances
+        extended = tips - bases
+        top_extended = extended[:2].mean() > 0
+        bottom_extended = extended[2:].mean() > 0
+
+        if top_extended and bottom_extended:
+            pred = 'paper'
+        elif top_extended or bottom_extended:
+            pred = 'scissors'
+        else:
+            pred = 'rock'
+
+        return 1, 1, pred, 1, 1, 1
+
     def predict(self, landmark_array):
         """Will make a rock, paper or scissors classification based on the relative distances of 
         finger keypoints.
@@ -168,3 +335,75 @@ class DistanceClassifier:
             pred = 'rock'
 
         return 1, 1, pred, 1, 1, 1
+
+
+class LinearClassifier:
+    """
+    Softmax regression on landmark_features, trained offline on labelled hands with
+    run_train_classifier.py and stored as a .npz file.
+
+    Args:
+        weights (np.ndarray): Weights of shape (15, 3) on the standardized features.
+        bias (np.ndarray): Bias of shape (3,).
+        mean (np.ndarray): Feature mean of shape (15,) used for standardization.
+        scale (np.ndarray): Feature standard deviation of shape (15,).
+        labels (Sequence[str]): Class name of every weight column.
+    """
+
+    def __init__(self, weights, bias, mean, scale, labels=('rock', 'paper', 'scissors')):
+        self.weights = np.asarray(weights, dtype=np.float64)
+        self.bias = np.asarray(bias, dtype=np.float64)
+        self.mean = np.asarray(mean, dtype=np.float64)
+        self.scale = np.asarray(scale, dtype=np.float64)
+        self.labels = tuple(labels)
+        # Standardization folded into the weights, so inference is a single matrix product
+        self._weights = self.weights / self.scale[:, None]
+        self._bias = self.bias - (self.mean / self.scale) @ self.weights
+        self._order = [self.labels.index(name) for name in ('rock', 'paper', 'scissors')]
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as model:
+            return cls(model['weights'], model['bias'], model['mean'], model['scale'],
+                       labels=[str(label) for label in model['labels']])
+
+    def save(self, path):
+        np.savez(path, weights=self.weights, bias=self.bias, mean=self.mean, scale=self.scale,
+                 labels=np.array(self.labels))
+
+    def predict_proba(self, landmarks):
+        """Class probabilities of shape (..., 3), in the order of self.labels, of hands (..., 21, 3)."""
+        logits = landmark_features(landmarks) @ self._weights + self._bias
+        logits -= logits.max(axis=-1, keepdims=True)
+        probabilities = np.exp(logits)
+        return probabilities / probabilities.sum(axis=-1, keepdims=True)
+
+    def margin(self, rockiness, paperiness, scissoriness):
+        """How sure a prediction is: the gap between the two most likely hands, in percentage points."""
+        second, first = sorted((rockiness, paperiness, scissoriness))[1:]
+        return (first - second) / 2.55
+
+    def predict(self, landmark_array):
+        """Will make a rock, paper or scissors classification with the trained model.
+
+        Args:
+            landmark_array ([type]): Mediapipe landmark detections.
+
+        Returns:
+            Same as AngleClassifier.predict; the scores are the class probabilities scaled to 0-255,
+            so they double as the detection colour.
+        """
+        return self.predict_hand(HandFeatures(landmark_array))
+
+    def predict_hand(self, hand):
+        """Same as predict, on HandFeatures."""
+        features = hand.features
+        logits = features @ self._weights + self._bias
+        probabilities = np.exp(logits - logits.max())
+        probabilities *= 255 / probabilities.sum()
+
+        rockiness, paperiness, scissoriness = (float(probabilities[idx]) for idx in self._order)
+        pred = self.labels[int(probabilities.argmax())]
+        top_fingers_angle = float(features[:2].mean() * 180)
+        bottom_fingers_angle = float(features[2:4].mean() * 180)
+        return top_fingers_angle, bottom_fingers_angle, pred, rockiness, paperiness, scissoriness
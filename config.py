@@ -1,9 +1,32 @@
 """RPS bot configuration variables."""
 
+import os
+
+REPO_DIR=os.path.dirname(os.path.abspath(__file__))
+
 PHYSICAL=True
 
+# Send the moves to the hardware service (run_hardware_service.py) instead of opening the serial port in the app
+HARDWARE_SERVICE=False
+HARDWARE_SOCKET='/tmp/rps_hardware.sock'
+HARDWARE_MIN_INTERVAL=0.2  # seconds the service keeps the hand still after a move, whichever session sent it
+
 CACHE_TIME=0.5
 
+# Freestyle: only move when CONSENSUS_K of the last CONSENSUS_N frames agree, counting frames the classifier
+# is at least CONSENSUS_MIN_MARGIN sure of (degrees from the cutoff for the angle classifier, percentage
+# points between the two likeliest hands for the linear one); replaces the CACHE_TIME wait
+CONSENSUS=False
+CONSENSUS_K=3
+CONSENSUS_N=5
+CONSENSUS_MIN_MARGIN=5.
+
+# Freestyle: act on the hand the visitor is moving to, extrapolated EARLY_PREDICTION_HORIZON seconds
+# from the finger angle trend, once that is at least EARLY_PREDICTION_CONFIDENCE certain (see run_early_eval.py)
+EARLY_PREDICTION=False
+EARLY_PREDICTION_HORIZON=0.15
+EARLY_PREDICTION_CONFIDENCE=0.9
+
 COUNT_FROM=3
 DELAY=3
 TOO_FAST_DELAY=1
@@ -11,14 +34,74 @@ TOO_FAST_DELAY=1
 ANGLE_CUTOFF_FREESTYLE=100
 ANGLE_CUTOFF_GAME=100
 
+# 'angle' uses the ANGLE_CUTOFF_* above, 'linear' the model trained with run_train_classifier.py,
+# 'vote' a majority vote of VOTE_CLASSIFIERS ('angle', 'distance' and/or 'linear', once trained)
+CLASSIFIER='angle'
+CLASSIFIER_MODEL=os.path.join(REPO_DIR, 'models', 'linear_classifier.npz')
+VOTE_CLASSIFIERS=('angle', 'distance')
+# Classifiers shadow-tested on the live hands: they run on the same features without affecting the
+# prediction, and their timing and agreement are logged when a session ends
+SHADOW_CLASSIFIERS=()
+# Reuse the last prediction while no landmark moved more than DELTA_GATE_EPSILON (normalized image
+# coordinates) since it was computed, and only recompute the fingers that did move
+DELTA_GATE=False
+DELTA_GATE_EPSILON=0.004
+
 VERBOSE=False
 DISPLAY_DETECTION=True
 DISPLAY_FPS=False
 DISPLAY_ANGLES=False
 DISPLAY_CLASS_LABELS=False
 
+TRACING=False
+TRACE_OUTPUT='glass_to_servo_trace.json'
+
+FLIGHT_RECORDER_CAPACITY=4096
+FLIGHT_RECORDER_LATENCY_THRESHOLD=0.15
+FLIGHT_RECORDER_DIR='flight_records'
+
+RECORD_SESSIONS=False
+RECORDING_DIR='recordings'
+
+# Capture resolution and frame rate asked from the browser; larger frames are downscaled on arrival
+VIDEO_WIDTH=640
+VIDEO_HEIGHT=480
+VIDEO_FPS=30
+
+# Local camera settings for the kiosk (run_kiosk.py); compare them on the attached camera with run_camera_probe.py.
+# Settings left out keep the driver default. MJPG usually is the only format that reaches full fps at 640x480
+# and up over USB 2, and a buffer of 1 frame keeps the driver from queueing stale frames. exposure is in
+# driver units (V4L2: multiples of 100 us); a short fixed exposure keeps the camera from lowering the fps in dim light.
+CAMERA_ID=None  # USB vendor:product[:serial] of the kiosk camera (see run_camera_probe.py --list), None for the first camera
+CAMERA_CACHE='.camera_cache.json'
+CAPTURE_PROFILE='low_latency'
+CAPTURE_PROFILES={
+    'default': {'fps': 100},
+    'low_latency': {'backend': 'v4l2', 'fourcc': 'MJPG', 'width': 640, 'height': 480, 'fps': 60, 'buffer_size': 1},
+    'fixed_exposure': {'backend': 'v4l2', 'fourcc': 'MJPG', 'width': 640, 'height': 480, 'fps': 60, 'buffer_size': 1,
+                       'exposure': 150},
+    'hd': {'backend': 'v4l2', 'fourcc': 'MJPG', 'width': 1280, 'height': 720, 'fps': 30, 'buffer_size': 1},
+}
+
 MODEL_COMPLEXITY=1
 
+# One Euro filter on the landmarks: cutoff frequency (Hz) of a still hand and its increase per unit/s of movement
+SMOOTHING=False
+SMOOTHING_MIN_CUTOFF=1.5
+SMOOTHING_BETA=10.
+
+# Step down through these levels (model complexity, inference resolution, frame skip) when
+# processing a frame takes longer than LATENCY_BUDGET seconds, and back up when there is headroom
+ADAPTIVE_QUALITY=False
+LATENCY_BUDGET=0.05
+QUALITY_LEVELS=[
+    {'model_complexity': MODEL_COMPLEXITY, 'inference_scale': 1.0, 'frame_skip': 0},
+    {'model_complexity': 0, 'inference_scale': 1.0, 'frame_skip': 0},
+    {'model_complexity': 0, 'inference_scale': 0.75, 'frame_skip': 0},
+    {'model_complexity': 0, 'inference_scale': 0.5, 'frame_skip': 1},
+    {'model_complexity': 0, 'inference_scale': 0.5, 'frame_skip': 2},
+]
+
 MIN_DETECTION_CONFIDENCE_FREESTYLE=0.2
 MIN_TRACKING_CONFIDENCE_FREESTYLE=0.9
 MIN_DETECTION_CONFIDENCE_GAME=0.1
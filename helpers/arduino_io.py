@@ -1,9 +1,11 @@
+import os
+import threading
 import time
 
 import serial.tools.list_ports
 from serial import Serial
 
-from helpers.gui_helper import putCountDown
+from helpers.trace_helper import TRACER
 
 
 class ArduinoLink(object):
@@ -66,15 +68,19 @@ class ArduinoLink(object):
             pass
         else:
             message = chr(message).encode()
-        for idx in range(20):
-            try:
-                self.link.write(message)
-                break
-            except:
-                time.sleep(0.1)
-                if idx == 19:
-                    self.test_ports()
-                    self.write(message)
+        with TRACER.span('serial_write'):
+            for idx in range(20):
+                try:
+                    self.link.write(message)
+                    if TRACER.enabled:
+                        # Wait until the byte has actually left the port
+                        self.link.flush()
+                    break
+                except:
+                    time.sleep(0.1)
+                    if idx == 19:
+                        self.test_ports()
+                        self.write(message)
 
         if verbose:
             print(f'wrote {message} to {self.link.port}')
@@ -94,3 +100,51 @@ class ArduinoLink(object):
         comports = serial.tools.list_ports.comports()
         ports = [port.device for port in comports if port.device]
         return ports
+
+
+class MockArduinoLink(object):
+    """In-memory stand-in for ArduinoLink that keeps every written move."""
+
+    def __init__(self):
+        self.writes = []
+
+    def write(self, message, verbose=False):
+        if not isinstance(message, bytes):
+            message = chr(message).encode()
+        self.writes.append((time.time(), message))
+
+
+class PtyArduino(object):
+    """
+    Emulates the Arduino firmware on a pseudo-terminal, so the real
+    ArduinoLink and pyserial path can be exercised without hardware.
+    Connect an ArduinoLink to `port` after calling start().
+    """
+
+    def __init__(self):
+        self.master, slave = os.openpty()
+        self.port = os.ttyname(slave)
+        self._slave = slave
+        self.moves = []
+        self.stopped = False
+
+    def start(self):
+        threading.Thread(target=self.run, name='PtyArduino', daemon=True).start()
+        return self
+
+    def run(self):
+        while not self.stopped:
+            try:
+                data = os.read(self.master, 64)
+            except OSError:
+                return
+            for byte in data:
+                if byte == ord('Q'):  # handshake
+                    os.write(self.master, b'R')
+                else:
+                    self.moves.append((time.time(), bytes([byte])))
+
+    def stop(self):
+        self.stopped = True
+        os.close(self.master)
+        os.close(self._slave)
@@ -0,0 +1,97 @@
+"""Timing utilities for the microbenchmark suite and the load test."""
+
+import gc
+import json
+import platform
+import time
+import tracemalloc
+
+import numpy as np
+
+
+def percentiles_us(durations):
+    """Mean, p50 and p99 of durations in seconds, in microseconds."""
+    durations = np.asarray(durations) * 1e6
+    return {
+        'mean_us': float(durations.mean()),
+        'p50_us': float(np.percentile(durations, 50)),
+        'p99_us': float(np.percentile(durations, 99)),
+    }
+
+
+def bench(fn, min_time=1., min_calls=20, max_calls=100000, warmup=5, alloc_calls=5):
+    """Times fn() call by call.
+
+    The garbage collector is disabled while timing so collections of earlier
+    allocations don't land on random calls. Allocations are measured in a
+    separate pass, since tracing them slows every call down.
+
+    Returns:
+        dict: calls, mean/p50/p99 in microseconds and the peak bytes allocated per call.
+    """
+    for _ in range(warmup):
+        fn()
+
+    durations = []
+    gc_was_enabled = gc.isenabled()
+    gc.collect()
+    gc.disable()
+    try:
+        start = time.perf_counter()
+        while len(durations) < max_calls and (len(durations) < min_calls or time.perf_counter() - start < min_time):
+            start_call = time.perf_counter()
+            fn()
+            durations.append(time.perf_counter() - start_call)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+    peaks = []
+    for _ in range(alloc_calls):
+        tracemalloc.start()
+        fn()
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+
+    result = {'calls': len(durations)}
+    result.update(percentiles_us(durations))
+    result['alloc_peak_bytes'] = int(np.median(peaks)) if peaks else None
+    return result
+
+
+def environment():
+    return {
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'processor': platform.processor(),
+        'numpy': np.__version__,
+        'time': time.strftime('%Y-%m-%d %H:%M:%S'),
+    }
+
+
+def save_results(path, results):
+    with open(path, 'w') as f:
+        json.dump({'environment': environment(), 'results': results}, f, indent=2)
+
+
+def compare(results, baseline_path, key='p50_us', threshold=0.1):
+    """Compares results against a saved baseline.
+
+    Returns:
+        List[Tuple[str, float, float]]: (name, baseline, current) of every benchmark that
+            got slower by more than the threshold (relative).
+    """
+    with open(baseline_path) as f:
+        baseline = json.load(f)['results']
+
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        before, after = baseline[name][key], result[key]
+        change = (after - before) / before if before else 0
+        marker = ' <-- REGRESSION' if change > threshold else ''
+        print(f'{name:45} {before:12.1f} -> {after:12.1f} {key} ({change:+.1%}){marker}')
+        if change > threshold:
+            regressions.append((name, before, after))
+    return regressions
@@ -0,0 +1,148 @@
+"""Camera discovery from sysfs and V4L2 metadata, without opening every possible VideoCapture index."""
+
+import json
+import logging
+import os
+import struct
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+
+SYSFS_VIDEO = '/sys/class/video4linux'
+# struct v4l2_capability: driver[16], card[32], bus_info[32], version, capabilities, device_caps, reserved[3]
+V4L2_CAPABILITY = struct.Struct('16s32s32sIII12x')
+VIDIOC_QUERYCAP = 0x80685600  # _IOR('V', 0, struct v4l2_capability)
+V4L2_CAP_VIDEO_CAPTURE = 0x1
+V4L2_CAP_DEVICE_CAPS = 0x80000000
+
+# A camera node: VideoCapture index, device path, name and the stable identity of the USB device
+# (vendor:product[:serial], None for non-USB cameras) with the USB port it is plugged into
+Camera = namedtuple('Camera', ['index', 'path', 'name', 'usb_id', 'usb_port'])
+
+logger = logging.getLogger('camera_helper')
+
+
+def _read(path):
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def _usb_identity(node_dir):
+    """Identity and port of the USB device a video node belongs to, from its sysfs parents."""
+    device = os.path.realpath(os.path.join(node_dir, 'device'))
+    # The node hangs off a USB interface (e.g. 1-1.2:1.0); the device (1-1.2) holds the ids
+    for usb_dir in (device, os.path.dirname(device)):
+        vendor, product = _read(os.path.join(usb_dir, 'idVendor')), _read(os.path.join(usb_dir, 'idProduct'))
+        if vendor and product:
+            serial = _read(os.path.join(usb_dir, 'serial'))
+            usb_id = f'{vendor}:{product}:{serial}' if serial else f'{vendor}:{product}'
+            return usb_id, os.path.basename(usb_dir)
+    return None, None
+
+
+def list_video_nodes(sysfs_root=SYSFS_VIDEO):
+    """All /dev/video* nodes known to sysfs, sorted by index.
+
+    Returns:
+        List[Camera]: Every node, also the metadata and output nodes that can't capture.
+    """
+    nodes = []
+    for entry in os.listdir(sysfs_root):
+        if not entry.startswith('video') or not entry[5:].isdigit():
+            continue
+        node_dir = os.path.join(sysfs_root, entry)
+        usb_id, usb_port = _usb_identity(node_dir)
+        nodes.append(Camera(int(entry[5:]), os.path.join('/dev', entry), _read(os.path.join(node_dir, 'name')),
+                            usb_id, usb_port))
+    return sorted(nodes)
+
+
+def can_capture(path):
+    """Does the V4L2 node capture video? Asks the driver (VIDIOC_QUERYCAP) without streaming."""
+    import fcntl  # Linux only, like the sysfs listing this is used with
+
+    try:
+        fd = os.open(path, os.O_RDWR | os.O_NONBLOCK)
+    except OSError:
+        return False
+    try:
+        buffer = bytearray(V4L2_CAPABILITY.size)
+        fcntl.ioctl(fd, VIDIOC_QUERYCAP, buffer)
+    except OSError:
+        return False
+    finally:
+        os.close(fd)
+    _, _, _, _, capabilities, device_caps = V4L2_CAPABILITY.unpack(buffer)
+    caps = device_caps if capabilities & V4L2_CAP_DEVICE_CAPS else capabilities
+    return bool(caps & V4L2_CAP_VIDEO_CAPTURE)
+
+
+def probe(index, backend=cv2.CAP_ANY):
+    """Can a frame be read from camera index?"""
+    cap = cv2.VideoCapture(index, backend)
+    try:
+        return cap.isOpened() and cap.grab()
+    finally:
+        cap.release()
+
+
+def _load_cache(cache_path):
+    try:
+        with open(cache_path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def discover_cameras(cache_path=None, refresh=False, sysfs_root=SYSFS_VIDEO):
+    """Finds the connected cameras.
+
+    On Linux the nodes come from sysfs, only nodes the driver reports as capture
+    devices are opened, and all of them at the same time. The result is cached
+    in cache_path together with the node listing (with USB identities), and used
+    as is while the same devices sit on the same nodes. Only complete results are
+    cached: when a capture node fails its probe (e.g. busy), nothing is written, so
+    the next call probes again. Elsewhere the first 20 indices are probed in parallel.
+
+    Returns:
+        List[Camera]: Cameras a frame could be read from, sorted by index.
+    """
+    if not os.path.isdir(sysfs_root):
+        with ThreadPoolExecutor(max_workers=20) as pool:
+            found = pool.map(probe, range(20))
+        return [Camera(index, None, None, None, None) for index, ok in zip(range(20), found) if ok]
+
+    nodes = list_video_nodes(sysfs_root)
+    listing = [list(node) for node in nodes]
+    if cache_path and not refresh:
+        cache = _load_cache(cache_path)
+        if cache and cache['nodes'] == listing and cache['cameras']:
+            return [Camera(*camera) for camera in cache['cameras']]
+
+    candidates = [node for node in nodes if can_capture(node.path)]
+    with ThreadPoolExecutor(max_workers=max(len(candidates), 1)) as pool:
+        found = list(pool.map(lambda node: probe(node.index, cv2.CAP_V4L2), candidates))
+    cameras = [node for node, ok in zip(candidates, found) if ok]
+
+    if cache_path and cameras and all(found):
+        try:
+            with open(cache_path, 'w') as f:
+                json.dump({'nodes': listing, 'cameras': [list(camera) for camera in cameras]}, f)
+        except OSError as e:
+            logger.warning('Could not write camera cache %s: %s', cache_path, e)
+    return cameras
+
+
+def find_camera(usb_id=None, cache_path=None):
+    """Index of the camera with the given USB identity (a prefix such as vendor:product
+    matches too), or of the first camera when usb_id is None. None when there is no match.
+    """
+    for refresh in (False, True) if cache_path else (True,):
+        for camera in discover_cameras(cache_path=cache_path, refresh=refresh):
+            if usb_id is None or (camera.usb_id or '').startswith(usb_id):
+                return camera.index
+    return None
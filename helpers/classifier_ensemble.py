@@ -0,0 +1,157 @@
+"""Several classifiers on one hand, sharing its features: majority voting and shadow testing."""
+
+import os
+import time
+from collections import Counter
+
+from classification import (AngleClassifier, DistanceClassifier, HandFeatures,
+                            LinearClassifier)
+from helpers.delta_gate import DeltaGate
+
+# Classifier factories by name, taking the settings (angle_cutoff, model_path) of a replay or mode
+CLASSIFIERS = {
+    'angle': lambda settings: AngleClassifier(angle_cutoff=settings['angle_cutoff']),
+    'distance': lambda settings: DistanceClassifier(),
+    'linear': lambda settings: LinearClassifier.load(settings['model_path']),
+}
+VOTE = 'vote'
+MISSING_MODEL = 'No linear classifier model at {}. Train one with: python run_train_classifier.py <recordings...>'
+
+
+def settings_from_config(cfg, angle_cutoff=None):
+    """build_classifier settings from the CLASSIFIER, SHADOW_CLASSIFIERS and DELTA_GATE settings in config.py."""
+    return {
+        'classifier': cfg.CLASSIFIER,
+        'angle_cutoff': angle_cutoff,
+        'model_path': cfg.CLASSIFIER_MODEL,
+        'members': cfg.VOTE_CLASSIFIERS,
+        'shadow': cfg.SHADOW_CLASSIFIERS,
+        'delta_gate': cfg.DELTA_GATE_EPSILON if cfg.DELTA_GATE else None,
+    }
+
+
+def classifier_names(settings):
+    """Names of every classifier build_classifier builds for the settings."""
+    names = set(settings.get('shadow') or ())
+    if settings['classifier'] == VOTE:
+        names.update(settings['members'])
+    else:
+        names.add(settings['classifier'])
+    return names
+
+
+def missing_model(settings):
+    """Error message when the settings need the linear classifier and its model file doesn't exist, else None."""
+    if 'linear' in classifier_names(settings) and not os.path.isfile(settings['model_path'] or ''):
+        return MISSING_MODEL.format(settings['model_path'])
+    return None
+
+
+def build_classifier(settings):
+    """Builds the classifier settings['classifier'] names.
+
+    'vote' is a majority vote of the classifiers in settings['members']. Classifiers in
+    settings['shadow'] run alongside on the same hand, without affecting the prediction.
+    With settings['delta_gate'] set, the classifier is wrapped in a DeltaGate with that epsilon.
+    """
+    problem = missing_model(settings)
+    if problem:
+        raise FileNotFoundError(problem)
+    name = settings['classifier']
+    shadow = [member for member in settings.get('shadow') or () if member != name]
+    if name == VOTE:
+        members = list(settings['members']) + [member for member in shadow if member not in settings['members']]
+        classifier = ClassifierEnsemble({member: CLASSIFIERS[member](settings) for member in members},
+                                        voters=settings['members'])
+    elif name not in CLASSIFIERS:
+        raise ValueError(f'Unknown classifier: {name}')
+    elif shadow:
+        members = [name] + shadow
+        classifier = ClassifierEnsemble({member: CLASSIFIERS[member](settings) for member in members}, voters=[name])
+    else:
+        classifier = CLASSIFIERS[name](settings)
+
+    if settings.get('delta_gate'):
+        return DeltaGate(classifier, epsilon=settings['delta_gate'])
+    return classifier
+
+
+class ClassifierEnsemble(object):
+    """
+    Runs several classifiers on the HandFeatures of every hand, so the landmark array, finger
+    angles and palm distances are computed once, whichever classifiers ask for them. A feature
+    is timed as part of the first classifier that uses it.
+
+    The prediction is the majority of the voters (ties go to the first voter); the other
+    classifiers are shadows, whose predictions and timings are only kept for comparison.
+    Hands a DeltaGate answers with the last result are tallied through repeat, so the
+    agreements and counts cover every hand and the timings only the classified ones.
+
+    Args:
+        classifiers (Dict[str, object]): Classifiers by name, with a predict_hand method.
+        voters (Sequence[str]): Names of the classifiers that decide the prediction; all by default.
+    """
+
+    def __init__(self, classifiers, voters=None):
+        self.classifiers = dict(classifiers)
+        self.voters = list(voters) if voters else list(self.classifiers)
+        self.last_predictions = {}
+        self.last_pred = None
+        self.timings = {}
+        self.frames = 0
+        self.classified = 0
+        self.total_time = Counter()
+        self.agreements = Counter()
+        self.counts = {name: Counter() for name in self.classifiers}
+        self._scorer = self.classifiers[self.voters[0]]
+
+    def predict(self, landmark_array):
+        """Same as AngleClassifier.predict; angles and scores come from the first voter agreeing with the vote."""
+        return self.predict_hand(HandFeatures(landmark_array))
+
+    def predict_hand(self, hand):
+        results = {}
+        for name, classifier in self.classifiers.items():
+            start = time.perf_counter()
+            results[name] = classifier.predict_hand(hand)
+            self.timings[name] = time.perf_counter() - start
+        self.last_predictions = {name: result[2] for name, result in results.items()}
+
+        votes = Counter(self.last_predictions[name] for name in self.voters)
+        most = max(votes.values())
+        winner = next(name for name in self.voters if votes[self.last_predictions[name]] == most)
+        self._scorer = self.classifiers[winner]
+        pred = self.last_predictions[winner]
+
+        self.classified += 1
+        self.total_time.update(self.timings)
+        self._tally(pred)
+        return results[winner]
+
+    def repeat(self):
+        """Tallies a hand that got the same predictions as the last one without being classified again."""
+        if self.last_predictions:
+            self._tally(self.last_pred)
+
+    def _tally(self, pred):
+        self.last_pred = pred
+        self.frames += 1
+        self.agreements.update(name for name, member_pred in self.last_predictions.items() if member_pred == pred)
+        for name, member_pred in self.last_predictions.items():
+            self.counts[name][member_pred] += 1
+
+    def margin(self, rockiness, paperiness, scissoriness):
+        """Margin of the classifier the last scores came from."""
+        return self._scorer.margin(rockiness, paperiness, scissoriness)
+
+    def summary(self):
+        """Per classifier the mean time per classified hand, how often it agreed with the prediction and its prediction counts."""
+        return {
+            name: {
+                'voter': name in self.voters,
+                'mean_us': self.total_time[name] / self.classified * 1e6 if self.classified else None,
+                'agreement': self.agreements[name] / self.frames if self.frames else None,
+                'counts': dict(self.counts[name]),
+            }
+            for name in self.classifiers
+        }
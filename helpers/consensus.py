@@ -0,0 +1,30 @@
+"""Streaming k-of-n agreement over the per-frame predictions, against single-frame flicker."""
+
+from collections import deque
+
+
+class Consensus(object):
+    """
+    Keeps the last n predictions and commits to a hand as soon as k of them agree.
+    Predictions with a margin below min_margin don't count towards any hand.
+
+    Args:
+        k (int): Number of agreeing predictions needed.
+        n (int): Size of the window.
+        min_margin (float): Minimum classifier margin (see AngleClassifier.margin) of a counting prediction.
+    """
+
+    def __init__(self, k=3, n=5, min_margin=5.):
+        self.k = k
+        self.min_margin = min_margin
+        self.window = deque(maxlen=n)
+
+    def reset(self):
+        self.window.clear()
+
+    def update(self, pred, margin):
+        """Adds the prediction of a frame; returns the hand k of the last n frames agree on, or None."""
+        self.window.append(pred if margin >= self.min_margin else None)
+        if pred is not None and self.window.count(pred) >= self.k:
+            return pred
+        return None
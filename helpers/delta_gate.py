@@ -0,0 +1,77 @@
+"""Skips reclassifying hands that hardly moved since the last frame."""
+
+import numpy as np
+
+from classification import FINGER_JOINTS, HandFeatures, joint_angles
+
+# Wrist and thumb: when these move, every feature may have changed
+HAND_LANDMARKS = np.array([0, 2, 3, 4])
+
+
+class DeltaGate(object):
+    """
+    Wraps a classifier (with a predict_hand method) and compares every hand with the one
+    the last result was computed on. When no landmark moved more than epsilon, the last
+    prediction and scores are returned as they are. When only some fingers moved, only their
+    knuckle angles are recomputed. Otherwise the hand is classified from scratch.
+
+    Movement is compared against the hand of the last computation rather than the previous
+    frame, so slow drift below epsilon per frame still adds up to a recomputation. A wrapped
+    classifier with a repeat method (ClassifierEnsemble) is told about every reused result.
+
+    Args:
+        classifier: Classifier with predict_hand and margin methods.
+        epsilon (float): Largest x or y movement (normalized image coordinates) of a still landmark.
+    """
+
+    def __init__(self, classifier, epsilon=0.004):
+        self.classifier = classifier
+        self.epsilon = epsilon
+        self.reference = None  # landmarks the cached angles were computed on
+        self.angles = None
+        self.result = None
+        self.counts = {'reused': 0, 'partial': 0, 'full': 0}
+
+    def reset(self):
+        self.reference = None
+        self.angles = None
+        self.result = None
+
+    def margin(self, rockiness, paperiness, scissoriness):
+        return self.classifier.margin(rockiness, paperiness, scissoriness)
+
+    def predict(self, landmark_array):
+        return self.predict_hand(HandFeatures(landmark_array))
+
+    def predict_hand(self, hand):
+        """Same as the classifier's predict_hand; the very same result tuple is returned while the hand is still."""
+        landmarks = hand.landmarks
+        if self.reference is not None:
+            moved = np.abs(landmarks[:, :2] - self.reference[:, :2]).max(axis=1) > self.epsilon
+            if not moved.any():
+                return self._reuse()
+
+        if self.reference is None or moved[HAND_LANDMARKS].any():
+            self.counts['full'] += 1
+            self.reference = landmarks.copy()
+            self.angles = hand.finger_angles
+        else:
+            fingers = moved[FINGER_JOINTS].any(axis=1)
+            self.reference[moved] = landmarks[moved]
+            if not fingers.any():  # only landmarks no classifier looks at
+                return self._reuse()
+            self.counts['partial'] += 1
+            joints = FINGER_JOINTS[fingers]
+            self.angles = self.angles.copy()
+            self.angles[fingers] = joint_angles(landmarks, joints)
+            self.reference[joints.ravel()] = landmarks[joints.ravel()]
+            hand = HandFeatures(landmarks, finger_angles=self.angles)
+
+        self.result = self.classifier.predict_hand(hand)
+        return self.result
+
+    def _reuse(self):
+        self.counts['reused'] += 1
+        if hasattr(self.classifier, 'repeat'):
+            self.classifier.repeat()
+        return self.result
@@ -0,0 +1,127 @@
+"""In-memory flight recorder of the most recent frames, dumped to disk when something goes wrong."""
+
+import logging
+import os
+import threading
+import time
+
+import numpy as np
+
+STAGES = ('detect', 'classify', 'draw', 'total')
+PREDICTIONS = ('', 'rock', 'paper', 'scissors')
+
+RECORD_DTYPE = np.dtype([
+    ('time', 'f8'),
+    ('timings', 'f4', (len(STAGES),)),
+    ('pred', 'i1'),
+    ('command', 'S1'),
+    ('detected', '?'),  # False when the frame reused an earlier detection or wasn't processed at all
+    ('landmarks', 'f4', (21, 3)),
+])
+
+
+def load_flight_record(path):
+    """Loads a dump written by FlightRecorder.dump as a structured array (oldest frame first)."""
+    return np.load(path)
+
+
+class FlightRecorder:
+    """
+    Fixed-size ring buffer with one preallocated record per frame.
+    Recording a frame is a handful of array assignments; nothing is
+    formatted or written to disk unless a frame is too slow or recv
+    raises, at which point the whole buffer is dumped as a .npy file
+    by a background thread.
+    """
+
+    def __init__(self, capacity=4096, latency_threshold=0.15, dump_dir='flight_records',
+                 min_dump_interval=10.):
+        self.logger = logging.getLogger('FlightRecorder')
+        self.records = np.zeros(capacity, dtype=RECORD_DTYPE)
+        self.capacity = capacity
+        self.latency_threshold = latency_threshold
+        self.dump_dir = dump_dir
+        self.min_dump_interval = min_dump_interval
+        self.count = 0
+        self.last_dump = 0
+        self._lock = threading.Lock()
+        self._seen_frames = None  # VideoProcessor.frames at the last record_frame
+        self.writer = None  # thread writing the last dump
+
+    def record(self, detect=0., classify=0., draw=0., total=0., pred=None, landmarks=None, command=b'',
+               detected=True):
+        """Stores the record of one frame, overwriting the oldest one.
+
+        Returns:
+            str: Path of the dump if this frame exceeded the latency threshold, else None.
+        """
+        record = self.records[self.count % self.capacity]
+        record['time'] = time.time()
+        record['timings'] = (detect, classify, draw, total)
+        record['pred'] = PREDICTIONS.index(pred) if pred else 0
+        record['command'] = command or b''
+        record['detected'] = detected
+        if landmarks is None:
+            record['landmarks'] = np.nan
+        else:
+            record['landmarks'] = landmarks
+        self.count += 1
+
+        if total > self.latency_threshold:
+            return self.dump(reason='slow')
+
+    def record_frame(self, video_processor, total, command=b''):
+        """Stores a record from the last frame handled by a VideoProcessor. Frames it didn't
+        process (e.g. game freeze and alert frames) get zero stage timings and no hand."""
+        processed = video_processor.frames != self._seen_frames
+        self._seen_frames = video_processor.frames
+        if not processed:
+            return self.record(total=total, command=command, detected=False)
+        timings = video_processor.timings
+        return self.record(
+            detect=timings['detect'],
+            classify=timings['classify'],
+            draw=timings['draw'],
+            total=total,
+            pred=video_processor.last_pred,
+            landmarks=video_processor.last_landmarks,
+            command=command,
+            detected=video_processor.fresh_detection,
+        )
+
+    def snapshot(self):
+        """Returns a copy of the buffered records, oldest first."""
+        if self.count < self.capacity:
+            return self.records[:self.count].copy()
+        start = self.count % self.capacity
+        return np.concatenate((self.records[start:], self.records[:start]))
+
+    def dump(self, reason='manual', force=False):
+        """Writes the buffer to a binary .npy file in a background thread, so the
+        frame that triggered the dump isn't delayed further.
+
+        Dumps are rate limited so a burst of slow frames only produces one file,
+        unless force is set (e.g. for exceptions).
+
+        Returns:
+            str: Path the dump is written to, or None when rate limited.
+        """
+        with self._lock:
+            now = time.time()
+            if not force and now - self.last_dump < self.min_dump_interval:
+                return None
+            self.last_dump = now
+
+        path = os.path.join(self.dump_dir, f'{time.strftime("%Y%m%d-%H%M%S")}-{reason}-{self.count}.npy')
+        self.writer = threading.Thread(target=self._write, args=(path, self.snapshot(), reason), daemon=True)
+        self.writer.start()
+        return path
+
+    def _write(self, path, records, reason):
+        try:
+            os.makedirs(self.dump_dir, exist_ok=True)
+            np.save(path, records)
+        except OSError as e:
+            self.logger.error('Could not dump frame records to %s: %s', path, e)
+            return
+        self.logger.warning('Dumped %d frame records to %s (%s)', len(records), path, reason)
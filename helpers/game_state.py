@@ -0,0 +1,139 @@
+"""Timing logic of game and freestyle mode, free of frames, hardware and the wall clock.
+
+The state machines are fed (timestamp, detection) events and answer with an Action
+telling the caller what to show and which move the robot should make. Timestamps can
+come from any clock (time.monotonic, frame pts, a simulation), so the same logic runs
+live in the modes and thousands of times faster than real time in simulate_games.
+"""
+
+from collections import namedtuple
+
+# kind is one of:
+#   'freeze'     keep showing the frame of the last play
+#   'alert'      the hand came too early, show the alert
+#   'countdown'  show count
+#   'play'       a hand was detected after the countdown: annotate it, send move and freeze this frame
+#   'annotate'   annotate the detected hand (freestyle), send move when it is set
+#   'idle'       show the frame as is
+Action = namedtuple('Action', ['kind', 'count', 'move'])
+FREEZE, ALERT, COUNTDOWN, PLAY, ANNOTATE, IDLE = 'freeze', 'alert', 'countdown', 'play', 'annotate', 'idle'
+
+# Robot move (Arduino command) that beats the detected hand
+COUNTER_MOVES = {'rock': b'P', 'paper': b'S', 'scissors': b'R'}
+
+
+class GameState(object):
+    """
+    Game mode: count down, then play against the first hand shown. A hand during the
+    countdown raises an alert and restarts the countdown after too_fast_delay. After a
+    play the frame is frozen for delay seconds, then the next countdown starts.
+    """
+
+    def __init__(self, start, count_from=3, delay=3, too_fast_delay=1):
+        self.count_from = count_from
+        self.delay = delay
+        self.too_fast_delay = too_fast_delay
+        self.count = start  # reference time of the countdown
+        self.last_freeze = None
+        self.last_too_fast = None
+
+    @property
+    def countdown_end(self):
+        return self.count + self.count_from - 1
+
+    def frozen(self, now):
+        """Is the frame of the last play still shown?"""
+        return self.last_freeze is not None and now - self.last_freeze <= self.delay
+
+    def _too_fast(self, now):
+        return self.last_too_fast is not None and now - self.last_too_fast < self.too_fast_delay
+
+    def wants_detection(self, now):
+        """Does the frame at now need hand detection? Not while frozen or showing the alert."""
+        return not (self.frozen(now) or self._too_fast(now))
+
+    def step(self, now, pred=None):
+        """Advances to now with the detected hand (rock, paper, scissors or None) and returns the Action."""
+        if self.frozen(now):
+            return Action(FREEZE, None, None)
+        if self._too_fast(now):
+            return Action(ALERT, None, None)
+
+        time_diff = abs(now - self.count)
+        if time_diff < self.count_from - 1:  # counting down
+            if pred:
+                self.count = now + self.too_fast_delay  # restart countdown
+                self.last_too_fast = now
+                return Action(ALERT, None, None)
+            return Action(COUNTDOWN, self.count_from - round(time_diff), None)
+
+        if pred:
+            self.count = now + self.delay
+            self.last_freeze = now
+            return Action(PLAY, None, COUNTER_MOVES.get(pred))
+        return Action(IDLE, None, None)
+
+
+class FreestyleState(object):
+    """
+    Freestyle mode: counter every hand, but only send a move when it differs from
+    the last one sent and that one was sent more than cache_time ago.
+    """
+
+    def __init__(self, cache_time=0.5):
+        self.cache_time = cache_time
+        self.last_sent = None
+        self.last_pred = None
+
+    def wants_detection(self, now):
+        return True
+
+    def step(self, now, pred=None):
+        if not pred:
+            return Action(IDLE, None, None)
+        move = None
+        if (self.last_sent is None or now - self.last_sent > self.cache_time) and pred != self.last_pred:
+            move = COUNTER_MOVES.get(pred)
+            self.last_sent, self.last_pred = now, pred
+        return Action(ANNOTATE, None, move)
+
+
+def simulate_games(state, rng, duration, fps=30., reaction=(0.3, 0.2), hold=(0.8, 0.3), labels=('rock', 'paper', 'scissors')):
+    """Plays game mode against simulated visitors for duration seconds of simulated time.
+
+    A visitor shows a random hand reaction seconds (normal distribution of mean, std)
+    after the countdown ends, which is too early when negative, and holds it for hold seconds.
+
+    Args:
+        state (GameState): State machine to play on; its start time is taken as time 0.
+        rng (np.random.Generator): Random generator for the visitors.
+
+    Returns:
+        dict: Number of frames, plays and alerts, and the delays (seconds) from the end of
+            the countdown to every play.
+    """
+    hand_from = hand_until = countdown_end = None
+    pred = None
+    plays, alerts, delays = 0, 0, []
+    start = state.count
+    frames = int(duration * fps)
+    for idx in range(frames):
+        now = start + idx / fps
+        if hand_until is not None and now >= hand_until:
+            hand_from = hand_until = None
+        visible = hand_from is not None and now >= hand_from
+        action = state.step(now, pred if visible and state.wants_detection(now) else None)
+
+        if action.kind == COUNTDOWN and hand_from is None:  # visitor gets ready for this countdown
+            hand_from = state.countdown_end + rng.normal(*reaction)
+            hand_until = hand_from + max(rng.normal(*hold), 1. / fps)
+            pred = labels[rng.integers(len(labels))]
+        elif action.kind == ALERT and visible:
+            alerts += 1
+            hand_from = hand_until = None  # the visitor pulls back and waits for the next countdown
+        elif action.kind == PLAY:
+            plays += 1
+            delays.append(now - countdown_end)
+        if action.kind == COUNTDOWN:
+            countdown_end = state.countdown_end
+    return {'frames': frames, 'plays': plays, 'alerts': alerts, 'delays': delays}
@@ -1,5 +1,8 @@
 """Contains functions to shape what the video stream GUI looks like."""
 
+import base64
+import os
+
 import numpy as np
 from PIL import ImageFont, ImageDraw, Image
 import cv2
@@ -11,7 +14,8 @@ COUNT_THICKNESS = 2
 COUNT_FONT_SIZE = 3.0
 
 FONT = cv2.FONT_HERSHEY_SIMPLEX
-GROTESK_FONT_PATH = '/home/rps/RPS/rock-paper-scissors-clean/helpers/fonts/grotesk_medium.ttf'
+HELPERS_DIR = os.path.dirname(os.path.abspath(__file__))
+GROTESK_FONT_PATH = os.path.join(HELPERS_DIR, 'fonts', 'grotesk_medium.ttf')
 FONT = ImageFont.truetype(GROTESK_FONT_PATH, 50)
 
 
@@ -29,7 +33,7 @@ def putDetection(frame, detection, color):
     """
     Add detection text to lower-left corner of a frame.
     """
-    detection_img = cv2.imread(f'/home/rps/RPS/rock-paper-scissors-clean/helpers/img/{detection}.png', -1)
+    detection_img = cv2.imread(os.path.join(HELPERS_DIR, 'img', f'{detection}.png'), -1)
     frame_width = int(frame.shape[1])
     x_offset = 0
     y_offset = 0
@@ -134,3 +138,66 @@ def putClassLabels(frame):
     cv2.putText(frame, f"Scissors",
                 (0, 300), cv2.FONT_HERSHEY_SIMPLEX, 1.0, (255, 255, 255))
     return frame
+
+
+# Mediapipe hand skeleton (same as mp.solutions.hands.HAND_CONNECTIONS)
+HAND_CONNECTIONS = (
+    (0, 1), (1, 2), (2, 3), (3, 4),
+    (0, 5), (5, 6), (6, 7), (7, 8),
+    (5, 9), (9, 10), (10, 11), (11, 12),
+    (9, 13), (13, 14), (14, 15), (15, 16),
+    (13, 17), (0, 17), (17, 18), (18, 19), (19, 20),
+)
+
+_SPRITES = {}
+
+# Offset of the browser overlay from its placeholder down to the video: the gap Streamlit 1.5
+# leaves between elements. Depends on Streamlit's layout CSS, hence streamlit==1.5.0 in requirements.txt.
+OVERLAY_TOP = '1rem'
+
+
+def _sprite(detection):
+    """The detection image as base64 PNG, with its width and height in pixels."""
+    if detection not in _SPRITES:
+        path = os.path.join(HELPERS_DIR, 'img', f'{detection}.png')
+        with Image.open(path) as image:
+            width, height = image.size
+        with open(path, 'rb') as f:
+            _SPRITES[detection] = base64.b64encode(f.read()).decode(), width, height
+    return _SPRITES[detection]
+
+
+def renderOverlayHtml(message, width=640, height=480):
+    """
+    Render an overlay message (see GameMode/FreeStyleMode with render=False)
+    as an SVG that the browser draws, instead of drawing on the frame.
+    The SVG takes no space on the page: placed right above the video, it is
+    positioned over it and scales with it. Its position relies on the element
+    gap of the pinned Streamlit version (OVERLAY_TOP), not on the video element
+    itself, so a Streamlit upgrade can misalign it.
+    """
+    elements = []
+    if message is None:
+        pass
+    elif message['type'] == 'hand':
+        b, g, r = (int(min(max(c, 0), 255)) for c in message['color'])
+        color = f'rgb({r},{g},{b})'
+        points = [(x * width, y * height) for x, y in message['landmarks']]
+        for start, end in HAND_CONNECTIONS:
+            (x1, y1), (x2, y2) = points[start], points[end]
+            elements.append(f'<line x1="{x1:.0f}" y1="{y1:.0f}" x2="{x2:.0f}" y2="{y2:.0f}" stroke="{color}" stroke-width="2"/>')
+        elements.extend(f'<circle cx="{x:.0f}" cy="{y:.0f}" r="3" fill="{color}"/>' for x, y in points)
+        if message.get('pred'):
+            sprite, sprite_width, sprite_height = _sprite(message['pred'])
+            elements.append(f'<image href="data:image/png;base64,{sprite}" x="0" y="0" '
+                            f'width="{sprite_width}" height="{sprite_height}"/>')
+    elif message['type'] == 'countdown':
+        elements.append(f'<text x="50%" y="50%" font-size="50" fill="rgb(255,255,0)" text-anchor="middle">{message["count"]}</text>')
+    elif message['type'] == 'alert':
+        elements.append('<text x="50%" y="45%" font-size="50" fill="rgb(255,255,0)" text-anchor="middle">Hand weg a.u.b</text>')
+        elements.append('<text x="50%" y="55%" font-size="30" fill="rgb(255,255,0)" text-anchor="middle">Retire la main s.v.p</text>')
+        elements.append('<text x="50%" y="63%" font-size="30" fill="rgb(255,255,0)" text-anchor="middle">Remove hand please</text>')
+
+    return ('<div style="position:relative;height:0">'
+            f'<svg viewBox="0 0 {width} {height}" style="position:absolute;top:{OVERLAY_TOP};left:0;width:100%;'
+            'z-index:1;pointer-events:none">' + ''.join(elements) + '</svg></div>')
@@ -0,0 +1,199 @@
+"""Local service that owns the Arduino link, so the web app never touches the serial port itself.
+
+Clients connect to a Unix socket and send moves as single bytes (b'P', b'R', b'S'). The
+service queues them for a writer thread, which writes them to the Arduino one at a time, in
+arrival order, and drops moves that come within min_interval of the previous one, so sessions
+can't make the robot hand jitter between moves. A slow write (ArduinoLink retries) therefore
+never stalls the other clients. b'I' asks for the link state, answered with one line of JSON.
+
+The socket is only accessible to the user running the service.
+"""
+
+import json
+import logging
+import os
+import queue
+import selectors
+import socket
+import threading
+import time
+
+from helpers.trace_helper import TRACER
+
+MOVES = b'PRS'
+INFO = b'I'
+
+logger = logging.getLogger('hardware_service')
+
+
+class HardwareService(object):
+    def __init__(self, link, socket_path, min_interval=0.):
+        self.link = link
+        self.socket_path = socket_path
+        self.min_interval = min_interval
+        self.moves = 0
+        self.dropped = 0
+        self.last_move = None
+        self.last_move_time = 0.
+        self.last_error = None
+        self.clients = set()
+        self.stopped = False
+        self.selector = selectors.DefaultSelector()
+        self.server = None
+        self.writes = queue.Queue()
+        self.writer = None
+
+    def start(self):
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)  # left behind by a previous run
+        self.server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.server.bind(self.socket_path)
+        os.chmod(self.socket_path, 0o600)  # only our user may drive the robot
+        self.server.listen()
+        self.server.setblocking(False)
+        self.selector.register(self.server, selectors.EVENT_READ)
+        self.writer = threading.Thread(target=self._write_moves, name='hardware-writer', daemon=True)
+        self.writer.start()
+        logger.info('Listening on %s', self.socket_path)
+        return self
+
+    def state(self):
+        serial = getattr(self.link, 'link', None)  # the pyserial port of an ArduinoLink
+        return {
+            'state': 'connected' if serial is None or serial.is_open else 'disconnected',
+            'port': getattr(serial, 'port', None),
+            'moves': self.moves,
+            'dropped': self.dropped,
+            'last_move': self.last_move.decode() if self.last_move else None,
+            'last_move_time': self.last_move_time,
+            'last_error': self.last_error,
+            'clients': len(self.clients),
+        }
+
+    def handle(self, data, client):
+        for byte in data:
+            message = bytes([byte])
+            if message == INFO:
+                client.sendall(json.dumps(self.state()).encode() + b'\n')
+            elif message in MOVES:
+                self.writes.put(message)
+            else:
+                logger.warning('Ignoring unknown command %r', message)
+
+    def move(self, message):
+        now = time.time()
+        if now - self.last_move_time < self.min_interval:
+            self.dropped += 1
+            return
+        try:
+            self.link.write(message)
+        except Exception as e:
+            self.last_error = f'{type(e).__name__}: {e}'
+            logger.error('Could not write %r to the Arduino: %s', message, e)
+            return
+        self.moves += 1
+        self.last_move, self.last_move_time = message, now
+
+    def _write_moves(self):
+        while True:
+            message = self.writes.get()
+            if message is None:
+                return
+            self.move(message)
+
+    def serve_forever(self):
+        while not self.stopped:
+            for key, _ in self.selector.select(timeout=0.5):
+                if key.fileobj is self.server:
+                    client, _ = self.server.accept()
+                    self.clients.add(client)
+                    self.selector.register(client, selectors.EVENT_READ)
+                    continue
+                client = key.fileobj
+                try:
+                    data = client.recv(64)
+                except OSError:
+                    data = b''
+                if data:
+                    self.handle(data, client)
+                else:  # client went away
+                    self.selector.unregister(client)
+                    self.clients.discard(client)
+                    client.close()
+
+    def stop(self):
+        self.stopped = True
+        if self.writer is not None:
+            self.writes.put(None)
+            self.writer.join()
+        for client in self.clients:
+            client.close()
+        self.selector.close()
+        if self.server is not None:
+            self.server.close()
+            os.unlink(self.socket_path)
+
+
+class HardwareClient(object):
+    """
+    Stand-in for ArduinoLink that passes the moves on to the hardware service.
+    Connects on first use and reconnects when the service restarts, so creating
+    one never touches hardware.
+    """
+
+    def __init__(self, socket_path, timeout=1.):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self.sock = None
+        self.lock = threading.Lock()
+
+    def _connect(self):
+        if self.sock is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            sock.connect(self.socket_path)
+            self.sock = sock
+        return self.sock
+
+    def _close(self):
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+
+    def write(self, message, verbose=False):
+        if not isinstance(message, bytes):
+            message = chr(message).encode()
+        # Same span name as ArduinoLink.write; it ends when the service has the move
+        with TRACER.span('serial_write'), self.lock:
+            for attempt in range(2):  # a broken connection is retried once on a new one
+                try:
+                    self._connect().sendall(message)
+                    break
+                except OSError as e:
+                    self._close()
+                    if attempt:
+                        logger.error('Hardware service unavailable at %s: %s', self.socket_path, e)
+                        return
+        if verbose:
+            print(f'sent {message} to {self.socket_path}')
+
+    def state(self):
+        """Link state reported by the service, or {'state': 'no service'} when it can't be reached."""
+        with self.lock:
+            try:
+                sock = self._connect()
+                sock.sendall(INFO)
+                reply = b''
+                while not reply.endswith(b'\n'):
+                    chunk = sock.recv(4096)
+                    if not chunk:
+                        raise ConnectionError('service closed the connection')
+                    reply += chunk
+                return json.loads(reply)
+            except (OSError, ValueError):
+                self._close()
+                return {'state': 'no service'}
+
+    def close(self):
+        with self.lock:
+            self._close()
@@ -0,0 +1,51 @@
+"""Adaptive low-pass filtering of hand landmarks against detector jitter."""
+
+import math
+
+import numpy as np
+
+
+class OneEuroFilter(object):
+    """
+    One Euro filter (Casiez et al., CHI 2012) over a whole landmark array at once.
+
+    Every coordinate gets its own cutoff frequency: min_cutoff (Hz) while it holds
+    still, which removes jitter, rising by beta per unit/s of speed, so fast moves
+    are followed without lag. Landmarks are in normalized image coordinates, so a
+    hand crossing the frame in a second moves at about 1 unit/s.
+    """
+
+    def __init__(self, min_cutoff=1.5, beta=10., d_cutoff=1.):
+        self.min_cutoff = min_cutoff
+        self.beta = beta
+        self.d_cutoff = d_cutoff
+        self.reset()
+
+    def reset(self):
+        """Starts over, e.g. when tracking is lost and the next hand needn't be near the last one."""
+        self.x = None
+        self.dx = None
+        self.t = None
+
+    @staticmethod
+    def _alpha(cutoff, dt):
+        tau = 1. / (2 * math.pi * cutoff)
+        return 1. / (1. + tau / dt)
+
+    def __call__(self, t, x):
+        """Filters the landmarks x (e.g. shape (21, 3)) observed at time t (seconds)."""
+        x = np.asarray(x, dtype=np.float32)
+        if self.x is None or t <= self.t:
+            self.x, self.dx, self.t = x.copy(), np.zeros_like(x), t
+            return self.x.copy()
+
+        dt = t - self.t
+        a_d = self._alpha(self.d_cutoff, dt)
+        self.dx = a_d * (x - self.x) / dt + (1 - a_d) * self.dx
+
+        cutoff = self.min_cutoff + self.beta * np.abs(self.dx)
+        tau = 1. / (2 * np.pi * cutoff)
+        a = 1. / (1. + tau / dt)
+        self.x = a * x + (1 - a) * self.x
+        self.t = t
+        return self.x.copy()
@@ -0,0 +1,77 @@
+"""Adapts the detection quality of a VideoProcessor to the processing latency at runtime."""
+
+import logging
+
+
+class QualityController:
+    """
+    Watches the per-frame processing latency of a VideoProcessor and moves
+    through a list of quality levels (model complexity, inference resolution,
+    frame skip), from best (index 0) to cheapest.
+
+    Hysteresis:
+        - the latency is smoothed with an exponential moving average,
+        - a step down needs the average above the budget for patience_down frames,
+        - a step up needs it below headroom * budget for patience_up frames,
+        - after a change the average starts over, and nothing is measured while the
+          processor is still swapping in the new detector nor for cooldown frames after,
+          so every level is judged on its own latencies before the next step.
+    """
+
+    def __init__(self, levels, latency_budget=0.05, headroom=0.6, patience_down=15, patience_up=150,
+                 smoothing=0.1, cooldown=30):
+        self.logger = logging.getLogger('QualityController')
+        self.levels = levels
+        self.latency_budget = latency_budget
+        self.headroom = headroom
+        self.patience_down = patience_down
+        self.patience_up = patience_up
+        self.smoothing = smoothing
+        self.cooldown = cooldown
+        self.cooldown_frames = 0
+        self.level = 0
+        self.average_latency = None
+        self.frames_over = 0
+        self.frames_under = 0
+
+    def update(self, video_processor, latency):
+        """Feeds the latency (seconds) of one frame and changes the quality level of the processor if needed.
+
+        Returns:
+            bool: Whether the quality level changed.
+        """
+        if getattr(video_processor, 'swap_pending', False):
+            return False
+        if self.cooldown_frames:
+            self.cooldown_frames -= 1
+            return False
+        if self.average_latency is None:
+            self.average_latency = latency
+        else:
+            self.average_latency += self.smoothing * (latency - self.average_latency)
+
+        if self.average_latency > self.latency_budget:
+            self.frames_over += 1
+            self.frames_under = 0
+        elif self.average_latency < self.headroom * self.latency_budget:
+            self.frames_under += 1
+            self.frames_over = 0
+        else:
+            self.frames_over = self.frames_under = 0
+
+        if self.frames_over >= self.patience_down and self.level < len(self.levels) - 1:
+            self.set_level(video_processor, self.level + 1)
+            return True
+        if self.frames_under >= self.patience_up and self.level > 0:
+            self.set_level(video_processor, self.level - 1)
+            return True
+        return False
+
+    def set_level(self, video_processor, level):
+        self.logger.info('Quality level %d -> %d (average latency %.1f ms): %s', self.level, level,
+                         1000 * (self.average_latency or 0), self.levels[level])
+        self.level = level
+        self.frames_over = self.frames_under = 0
+        self.average_latency = None
+        self.cooldown_frames = self.cooldown
+        video_processor.set_quality(**self.levels[level])
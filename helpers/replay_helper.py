@@ -0,0 +1,201 @@
+"""Headless replay of recorded videos and landmark recordings through the classification pipeline."""
+
+import os
+import time
+from multiprocessing import Pool
+
+import numpy as np
+
+from classification import array_to_landmarks
+from helpers.classifier_ensemble import ClassifierEnsemble, build_classifier
+from helpers.delta_gate import DeltaGate
+
+LABELS = ('rock', 'paper', 'scissors')
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mkv', '.mov', '.webm')
+
+DEFAULT_SETTINGS = {
+    'classifier': 'angle',
+    'angle_cutoff': 100,
+    'model_complexity': 1,
+    'min_detection_confidence': 0.5,
+    'min_tracking_confidence': 0.5,
+    'smoothing': None,  # (min_cutoff, beta) of a OneEuroFilter on the landmarks
+    'model_path': None,  # .npz of the linear classifier
+    'members': ('angle', 'distance'),  # voters of the 'vote' classifier
+    'shadow': (),  # classifiers compared on the same hands without affecting the prediction
+    'delta_gate': None,  # epsilon of a DeltaGate around the classifier
+}
+
+
+def label_for(path):
+    """Takes the label from the innermost path component named rock, paper or scissors (e.g. clips/rock/001.mp4)."""
+    for part in reversed(os.path.normpath(path).split(os.sep)):
+        name = os.path.splitext(part)[0].lower()
+        if name in LABELS:
+            return name
+    return None
+
+
+def find_inputs(paths):
+    """Expands directories into video files and recorded sessions (directories of .parquet batches)."""
+    inputs = []
+    for path in paths:
+        if os.path.isfile(path):
+            inputs.append(path)
+            continue
+        for root, dirs, files in os.walk(path):
+            if any(f.endswith('.parquet') for f in files):
+                inputs.append(root)
+            inputs.extend(os.path.join(root, f) for f in sorted(files) if f.lower().endswith(VIDEO_EXTENSIONS))
+    return inputs
+
+
+def summarize(path, latencies, preds, wall_time, label):
+    """Computes fps, latency percentiles and agreement with the label for one input."""
+    latencies = np.asarray(latencies) * 1000
+    detected = [pred for pred in preds if pred is not None]
+    summary = {
+        'path': path,
+        'label': label,
+        'frames': len(latencies),
+        'detections': len(detected),
+        'fps': len(latencies) / wall_time if wall_time > 0 else 0,
+        'latency_mean_ms': float(latencies.mean()) if len(latencies) else None,
+        'latency_p50_ms': float(np.percentile(latencies, 50)) if len(latencies) else None,
+        'latency_p90_ms': float(np.percentile(latencies, 90)) if len(latencies) else None,
+        'latency_p99_ms': float(np.percentile(latencies, 99)) if len(latencies) else None,
+        'agreement': None,
+        # Share of consecutive detections that changed prediction
+        'flicker': float(np.mean([a != b for a, b in zip(detected, detected[1:])])) if len(detected) > 1 else None,
+        'counts': {name: detected.count(name) for name in LABELS},
+    }
+    if label and detected:
+        summary['agreement'] = detected.count(label) / len(detected)
+    return summary
+
+
+def classifier_summaries(classifier, label):
+    """ClassifierEnsemble.summary with every classifier's agreement with the label, or None for a single classifier."""
+    if isinstance(classifier, DeltaGate):
+        classifier = classifier.classifier
+    if not isinstance(classifier, ClassifierEnsemble):
+        return None
+    summaries = classifier.summary()
+    for summary in summaries.values():
+        summary['label_agreement'] = summary['counts'].get(label, 0) / classifier.frames if label and classifier.frames else None
+    return summaries
+
+
+def run_video(path, settings, max_frames=None, classifier=None):
+    """Runs VideoProcessor over every frame of a video file, like the live recv does.
+    The classifier is built from the settings unless given.
+
+    Returns:
+        Tuple[list, list, np.ndarray, float]: Per-frame latencies and predictions (None without a hand),
+            the landmarks of every detected hand with shape (N, 21, 3) and the total wall time.
+    """
+    import cv2
+
+    from helpers.landmark_filter import OneEuroFilter
+    from helpers.video_helper import VideoProcessor
+
+    smoothing = settings.get('smoothing')
+    video_processor = VideoProcessor(
+        classifier=classifier or build_classifier(settings),
+        model_complexity=settings['model_complexity'],
+        min_detection_confidence=settings['min_detection_confidence'],
+        min_tracking_confidence=settings['min_tracking_confidence'],
+        smoother=OneEuroFilter(*smoothing) if smoothing else None,
+    )
+    capture = cv2.VideoCapture(path)
+    latencies, preds, landmarks = [], [], []
+    start = time.perf_counter()
+    try:
+        while max_frames is None or len(latencies) < max_frames:
+            grabbed, frame = capture.read()
+            if not grabbed:
+                break
+            timestamp = capture.get(cv2.CAP_PROP_POS_MSEC) / 1000  # capture time, so smoothing sees the real dt
+            start_frame = time.perf_counter()
+            results = video_processor.process(frame, timestamp=timestamp)
+            latencies.append(time.perf_counter() - start_frame)
+            preds.append(results[2] if results else None)
+            if results:
+                landmarks.append(video_processor.last_landmarks)
+    finally:
+        capture.release()
+        video_processor.close()
+
+    landmarks = np.array(landmarks, dtype=np.float32).reshape(-1, 21, 3)
+    return latencies, preds, landmarks, time.perf_counter() - start
+
+
+def evaluate_video(path, settings, max_frames=None):
+    classifier = build_classifier(settings)
+    latencies, preds, _, wall_time = run_video(path, settings, max_frames, classifier=classifier)
+    summary = summarize(path, latencies, preds, wall_time, label_for(path))
+    summary['classifiers'] = classifier_summaries(classifier, summary['label'])
+    summary['delta_gate'] = classifier.counts if isinstance(classifier, DeltaGate) else None
+    return summary
+
+
+def evaluate_recording(path, settings, max_frames=None):
+    """Runs the classifier over the landmarks of a recorded session (no detector involved).
+
+    Without a label in the path, agreement is measured against the live predictions of the recording.
+    """
+    from helpers.session_recorder import load_session
+
+    from helpers.landmark_filter import OneEuroFilter
+
+    session = load_session(path)
+    classifier = build_classifier(settings)
+    landmarks = session['landmarks'][:max_frames]
+    smoother = OneEuroFilter(*settings['smoothing']) if settings.get('smoothing') else None
+    latencies, preds = [], []
+    start = time.perf_counter()
+    for timestamp, hand in zip(session['time'], landmarks):
+        if smoother is not None:
+            hand = smoother(timestamp, hand)
+        hand = array_to_landmarks(hand)
+        start_frame = time.perf_counter()
+        preds.append(classifier.predict(hand)[2])
+        latencies.append(time.perf_counter() - start_frame)
+
+    summary = summarize(path, latencies, preds, time.perf_counter() - start, label_for(path))
+    if summary['label'] is None and len(preds):
+        live = session['pred'][:max_frames]
+        summary['agreement'] = float(np.mean([pred == live_pred for pred, live_pred in zip(preds, live)]))
+        summary['label'] = 'live'
+    summary['classifiers'] = classifier_summaries(classifier, label_for(path))
+    summary['delta_gate'] = classifier.counts if isinstance(classifier, DeltaGate) else None
+    return summary
+
+
+def evaluate(args):
+    path, settings, max_frames = args
+    if os.path.isdir(path) or path.endswith('.parquet'):
+        return evaluate_recording(path, settings, max_frames)
+    return evaluate_video(path, settings, max_frames)
+
+
+def evaluate_all(inputs, settings, workers=None, max_frames=None):
+    """Evaluates every input in a process pool (each worker builds its own detector).
+
+    Returns:
+        List[dict]: One summary per input, in input order.
+    """
+    jobs = [(path, settings, max_frames) for path in inputs]
+    if workers == 1:
+        return [evaluate(job) for job in jobs]
+    with Pool(processes=workers) as pool:
+        return pool.map(evaluate, jobs, chunksize=1)
+
+
+def overall_agreement(summaries, live=False):
+    """Detection-weighted agreement over all labelled inputs, or with live=True over the unlabelled
+    recordings, whose agreement is with their live predictions rather than a label."""
+    summaries = [s for s in summaries if s['agreement'] is not None and (s['label'] == 'live') == live]
+    agreeing = sum(s['agreement'] * s['detections'] for s in summaries)
+    total = sum(s['detections'] for s in summaries)
+    return agreeing / total if total else None
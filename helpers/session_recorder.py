@@ -0,0 +1,102 @@
+"""Records detected hand landmarks of live sessions to Parquet for offline tuning."""
+
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+SCHEMA = pa.schema([
+    ('time', pa.float64()),
+    ('mode', pa.string()),
+    ('pred', pa.string()),
+    ('top_angle', pa.float32()),
+    ('bottom_angle', pa.float32()),
+    ('landmarks', pa.list_(pa.float32(), 21 * 3)),
+])
+
+
+def load_session(path):
+    """Loads a recorded session (directory of batch files) or a whole recording directory.
+
+    Returns:
+        Dict[str, np.ndarray]: Columns as arrays, with landmarks shaped (N, 21, 3).
+    """
+    table = pq.read_table(path)
+    columns = {name: table.column(name).to_numpy() for name in SCHEMA.names if name != 'landmarks'}
+    landmarks = table.column('landmarks').combine_chunks()
+    columns['landmarks'] = landmarks.flatten().to_numpy().reshape(-1, 21, 3) if len(landmarks) else \
+        np.empty((0, 21, 3), dtype=np.float32)
+    return columns
+
+
+class SessionRecorder:
+    """
+    Collects one row per detected hand and writes them in batches from a
+    background thread. The calling thread only puts a tuple on a queue.
+    Each batch is a self-contained Parquet file, so a crash of the kiosk
+    never corrupts what has already been written.
+    """
+
+    def __init__(self, recording_dir='recordings', mode='', batch_size=1024, flush_interval=10.):
+        self.logger = logging.getLogger('SessionRecorder')
+        self.mode = mode
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.session_dir = os.path.join(recording_dir, f'{time.strftime("%Y%m%d-%H%M%S")}-{mode}-{uuid.uuid4().hex[:8]}')
+        self.queue = queue.SimpleQueue()
+        self.batches_written = 0
+        self.stopped = False
+        self.thread = threading.Thread(target=self._run, name='SessionRecorder', daemon=True)
+        self.thread.start()
+
+    def record(self, landmarks, pred, top_angle, bottom_angle, timestamp=None):
+        """Queues one detection; landmarks is a (21, 3) array."""
+        self.queue.put((timestamp or time.time(), pred, top_angle, bottom_angle, landmarks))
+
+    def _run(self):
+        rows = []
+        last_flush = time.time()
+        while True:
+            try:
+                row = self.queue.get(timeout=1.)
+            except queue.Empty:
+                row = None
+
+            if row is not None:
+                rows.append(row)
+            if rows and ((row is None and self.stopped) or len(rows) >= self.batch_size or
+                         time.time() - last_flush > self.flush_interval):
+                self._write(rows)
+                rows = []
+                last_flush = time.time()
+            if self.stopped and row is None:
+                return
+
+    def _write(self, rows):
+        times, preds, top_angles, bottom_angles, landmarks = zip(*rows)
+        flat = np.asarray(landmarks, dtype=np.float32).reshape(-1)
+        table = pa.Table.from_arrays([
+            pa.array(times, pa.float64()),
+            pa.array([self.mode] * len(rows), pa.string()),
+            pa.array(preds, pa.string()),
+            pa.array(top_angles, pa.float32()),
+            pa.array(bottom_angles, pa.float32()),
+            pa.FixedSizeListArray.from_arrays(pa.array(flat, pa.float32()), 21 * 3),
+        ], schema=SCHEMA)
+
+        os.makedirs(self.session_dir, exist_ok=True)
+        path = os.path.join(self.session_dir, f'{self.batches_written:06d}.parquet')
+        pq.write_table(table, path)
+        self.batches_written += 1
+        self.logger.debug('Wrote %d rows to %s', len(rows), path)
+
+    def close(self):
+        """Writes the remaining rows and stops the background thread."""
+        self.stopped = True
+        self.thread.join()
@@ -0,0 +1,105 @@
+"""Cold-start tools: an import-time profile and the warm-up of detectors, classification and overlays.
+
+Nothing heavy is imported at module level, so the web app can import this before
+mediapipe, cv2 and PIL are loaded and start the warm-up in the background.
+"""
+
+import logging
+import subprocess
+import sys
+import time
+
+logger = logging.getLogger('startup_helper')
+
+
+def import_profile(modules, python=sys.executable):
+    """Import times of modules and everything they import, measured in a fresh interpreter (python -X importtime).
+
+    Returns:
+        List[Tuple[str, float, float]]: (module, self seconds, cumulative seconds), slowest cumulative first.
+    """
+    code = ''.join(f'import {module}\n' for module in modules)
+    stderr = subprocess.run([python, '-X', 'importtime', '-c', code], stderr=subprocess.PIPE,
+                            stdout=subprocess.DEVNULL, universal_newlines=True).stderr
+    profile = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        profile.append((name.strip(), int(self_us) / 1e6, int(cumulative_us) / 1e6))
+    return sorted(profile, key=lambda row: row[2], reverse=True)
+
+
+def detector_settings():
+    """Detector settings (model complexity, detection and tracking confidence) of the game and freestyle mode."""
+    import config as cfg
+
+    return {
+        (cfg.MODEL_COMPLEXITY, cfg.MIN_DETECTION_CONFIDENCE_GAME, cfg.MIN_TRACKING_CONFIDENCE_GAME),
+        (cfg.MODEL_COMPLEXITY, cfg.MIN_DETECTION_CONFIDENCE_FREESTYLE, cfg.MIN_TRACKING_CONFIDENCE_FREESTYLE),
+    }
+
+
+def build_warm_detector(model_complexity, min_detection_confidence, min_tracking_confidence,
+                        width=640, height=480, frames=3):
+    """Builds a Mediapipe Hands detector and runs empty frames through it, which initializes its graph."""
+    import mediapipe as mp
+    import numpy as np
+
+    detector = mp.solutions.hands.Hands(
+        model_complexity=model_complexity,
+        static_image_mode=False,
+        max_num_hands=1,
+        min_detection_confidence=min_detection_confidence,
+        min_tracking_confidence=min_tracking_confidence
+    )
+    frame = np.zeros((height, width, 3), dtype=np.uint8)
+    for _ in range(frames):
+        detector.process(frame)
+    return detector
+
+
+def warm_up_pipeline(width=640, height=480):
+    """Runs classification, landmark drawing and every overlay once on a synthetic hand."""
+    import mediapipe as mp
+    import numpy as np
+
+    from classification import AngleClassifier, DistanceClassifier
+    from helpers import gui_helper
+    from helpers.synthetic_hands import HandGenerator, to_protobuf
+
+    hand = to_protobuf(HandGenerator(seed=0).generate(1, pose='rock')[0][0])
+    for classifier in (AngleClassifier(angle_cutoff=100), DistanceClassifier()):
+        classifier.predict(hand.landmark)
+
+    frame = np.zeros((height, width, 3), dtype=np.uint8)
+    mp.solutions.drawing_utils.draw_landmarks(frame, hand, mp.solutions.hands.HAND_CONNECTIONS)
+    gui_helper.putDetection(frame, 'rock', (0, 0, 0))
+    gui_helper.putAlert(frame)
+    gui_helper.putCountDown(frame, 3)
+    gui_helper.putTopAngle(frame, 0.)
+    gui_helper.putBottomAngle(frame, 0.)
+    gui_helper.putClassLabels(frame)
+    for message in ({'type': 'hand', 'landmarks': [[0.5, 0.5]] * 21, 'pred': 'rock', 'color': (0, 0, 0)},
+                    {'type': 'alert'}, {'type': 'countdown', 'count': 3}):
+        gui_helper.renderOverlayHtml(message, width=width, height=height)
+
+
+def warm_up(settings=None, width=640, height=480):
+    """Fills the detector pool with a warm detector per setting and warms up the rest of the pipeline.
+
+    Returns:
+        dict: Seconds spent per step.
+    """
+    from helpers.video_helper import DETECTOR_POOL
+
+    timings = {}
+    start = time.perf_counter()
+    warm_up_pipeline(width=width, height=height)
+    timings['pipeline'] = time.perf_counter() - start
+    for setting in settings or detector_settings():
+        start = time.perf_counter()
+        DETECTOR_POOL.fill(setting, lambda setting=setting: build_warm_detector(*setting, width=width, height=height))
+        timings[f'detector {setting}'] = time.perf_counter() - start
+    logger.info('Warm-up took %.2f s', sum(timings.values()))
+    return timings
@@ -0,0 +1,203 @@
+"""Procedural Mediapipe-format hand landmarks for benchmarks and tests, no camera needed."""
+
+import numpy as np
+
+from helpers.replay_helper import LABELS
+
+# Canonical right hand with the palm facing the camera and the fingers pointing up,
+# in units of roughly one hand length. Fingers are thumb, index, middle, ring, pink.
+FINGER_BASES = np.array([
+    (-0.12, -0.10, 0.),  # thumb CMC (1)
+    (-0.08, -0.38, 0.),  # index MCP (5)
+    (0.00, -0.40, 0.),   # middle MCP (9)
+    (0.07, -0.37, 0.),   # ring MCP (13)
+    (0.13, -0.32, 0.),   # pink MCP (17)
+])
+SEGMENT_LENGTHS = np.array([
+    (0.15, 0.13, 0.11),
+    (0.20, 0.12, 0.09),
+    (0.22, 0.14, 0.10),
+    (0.20, 0.13, 0.09),
+    (0.16, 0.10, 0.08),
+])
+# In-plane direction of every finger (degrees from straight up, positive towards the pink)
+FINGER_SPREAD = np.array([-40., -8., 0., 8., 16.])
+# Flexion (degrees) of the 3 joints of every finger when fully curled
+MAX_FLEXION = np.array([
+    (30., 60., 60.),
+    (80., 105., 75.),
+    (80., 105., 75.),
+    (80., 105., 75.),
+    (80., 105., 75.),
+])
+
+# Curl (0 = extended, 1 = fully curled) of thumb, index, middle, ring and pink finger per pose
+POSES = {
+    'rock': (1., 1., 1., 1., 1.),
+    'paper': (0., 0., 0., 0., 0.),
+    'scissors': (1., 0., 0., 1., 1.),
+}
+AMBIGUOUS = -1
+
+
+def hand_kinematics(flexion):
+    """Builds canonical hands from joint flexion angles.
+
+    Args:
+        flexion (np.ndarray): Flexion in degrees of shape (N, 5, 3): per finger the MCP, PIP and DIP joint
+            (CMC, MCP and IP for the thumb).
+
+    Returns:
+        np.ndarray: Landmarks of shape (N, 21, 3) in the canonical hand frame, with the wrist at the origin.
+    """
+    flexion = np.radians(np.asarray(flexion, dtype=np.float32))
+    n = len(flexion)
+
+    spread = np.radians(FINGER_SPREAD)
+    directions = np.stack([np.sin(spread), -np.cos(spread), np.zeros(5)], axis=-1)  # (5, 3)
+    normals = np.tile([0., 0., -1.], (5, 1))  # fingers curl towards the camera
+    normals[0] = (0.7, 0., -0.7)  # the thumb curls over the palm
+    normals /= np.linalg.norm(normals, axis=-1, keepdims=True)
+    plane = np.stack([directions, normals], axis=1).astype(np.float32)  # (5, 2, 3)
+
+    # Cumulative joint angles give every segment in the 2D flexion plane of its finger
+    theta = np.cumsum(flexion, axis=-1)  # (N, 5, 3)
+    lengths = SEGMENT_LENGTHS.astype(np.float32)
+    in_plane = np.stack([np.cumsum(np.cos(theta) * lengths, axis=-1),
+                         np.cumsum(np.sin(theta) * lengths, axis=-1)], axis=-1)  # (N, 5, 3, 2)
+
+    landmarks = np.zeros((n, 21, 3), dtype=np.float32)
+    fingers = landmarks[:, 1:].reshape(n, 5, 4, 3)
+    fingers[:, :, 0] = FINGER_BASES
+    fingers[:, :, 1:] = np.matmul(in_plane, plane[None]) + FINGER_BASES[None, :, None].astype(np.float32)
+    landmarks[:, 1:] = fingers.reshape(n, 20, 3)
+    return landmarks
+
+
+def rotation_matrices(roll, pitch, yaw):
+    """Rotation matrices of shape (N, 3, 3) from angles in degrees around the z (in-plane), x and y axis."""
+    roll, pitch, yaw = (np.radians(np.asarray(angle, dtype=np.float32)) for angle in (roll, pitch, yaw))
+    cz, sz, cx, sx, cy, sy = np.cos(roll), np.sin(roll), np.cos(pitch), np.sin(pitch), np.cos(yaw), np.sin(yaw)
+    zeros, ones = np.zeros_like(cz), np.ones_like(cz)
+    rz = np.stack([cz, -sz, zeros, sz, cz, zeros, zeros, zeros, ones], axis=-1).reshape(-1, 3, 3)
+    rx = np.stack([ones, zeros, zeros, zeros, cx, -sx, zeros, sx, cx], axis=-1).reshape(-1, 3, 3)
+    ry = np.stack([cy, zeros, sy, zeros, ones, zeros, -sy, zeros, cy], axis=-1).reshape(-1, 3, 3)
+    return rz @ rx @ ry
+
+
+class HandGenerator:
+    """
+    Generates random hands in rock, paper, scissors or ambiguous in-between poses,
+    in the normalized image coordinates Mediapipe uses.
+
+    Args:
+        rotation (float): Maximum in-plane rotation in degrees.
+        tilt (float): Maximum out-of-plane rotation in degrees.
+        scale (Tuple[float, float]): Range of the hand length as a fraction of the image.
+        noise (float): Standard deviation of the per-landmark Gaussian noise.
+        curl_jitter (float): Standard deviation of the per-finger curl around the pose.
+    """
+
+    def __init__(self, seed=None, rotation=30., tilt=25., scale=(0.25, 0.45), noise=0.004, curl_jitter=0.08):
+        self.rng = np.random.default_rng(seed)
+        self.rotation = rotation
+        self.tilt = tilt
+        self.scale = scale
+        self.noise = noise
+        self.curl_jitter = curl_jitter
+
+    def curls(self, labels):
+        """Random per-finger curls (N, 5) around the pose of each label (index into LABELS, or AMBIGUOUS)."""
+        labels = np.asarray(labels)
+        poses = np.array([POSES[name] for name in LABELS])
+        curls = poses[np.clip(labels, 0, None)]
+
+        # Ambiguous hands lie halfway between two different poses
+        ambiguous = labels == AMBIGUOUS
+        if ambiguous.any():
+            first = self.rng.integers(0, len(LABELS), ambiguous.sum())
+            second = (first + self.rng.integers(1, len(LABELS), ambiguous.sum())) % len(LABELS)
+            t = self.rng.uniform(0.35, 0.65, (ambiguous.sum(), 1))
+            curls[ambiguous] = (1 - t) * poses[first] + t * poses[second]
+
+        curls = curls + self.rng.normal(0, self.curl_jitter, curls.shape)
+        return np.clip(curls, 0, 1)
+
+    def place(self, hands, shared=False):
+        """Randomly rotates, scales, moves and perturbs canonical hands into image coordinates.
+        With shared=True all hands get the same placement, like the frames of one hand."""
+        n = 1 if shared else len(hands)
+        rotations = rotation_matrices(
+            self.rng.uniform(-self.rotation, self.rotation, n),
+            self.rng.uniform(-self.tilt, self.tilt, n),
+            self.rng.uniform(-self.tilt, self.tilt, n),
+        )
+        # Scale is folded into the rotation matrices
+        rotations *= self.rng.uniform(*self.scale, (n, 1, 1)).astype(np.float32)
+        centers = np.zeros((n, 1, 3), dtype=np.float32)
+        centers[..., :2] = self.rng.uniform(0.35, 0.65, (n, 1, 2))
+
+        # Rotate around the palm center instead of the wrist, so hands stay in the image
+        hands = hands - 0.5 * (hands[:, 0:1] + hands[:, 9:10])
+        hands = np.matmul(hands, np.ascontiguousarray(rotations.transpose(0, 2, 1)))
+        hands += centers
+        if self.noise:
+            hands += self.noise * self.rng.standard_normal(hands.shape, dtype=np.float32)
+        return hands
+
+    def from_curls(self, curls):
+        """Hands (N, 21, 3) in image coordinates from per-finger curls (N, 5)."""
+        flexion = np.asarray(curls)[..., None] * MAX_FLEXION
+        return self.place(hand_kinematics(flexion))
+
+    def trajectory(self, labels, fps=30., hold=0.5, transition=0.3):
+        """Frames of one hand going through the poses of labels (indices into LABELS): it holds
+        every pose for hold seconds and moves on to the next one in transition seconds, starting
+        and stopping smoothly.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray, np.ndarray]: Frame times (N,), landmarks (N, 21, 3) and
+                the label of the pose every frame holds or moves to (N,).
+        """
+        poses = self.curls(labels)
+        n_hold, n_move = int(round(hold * fps)), int(round(transition * fps))
+        curls, frame_labels = [], []
+        for idx, label in enumerate(labels):
+            curls.append(np.repeat(poses[idx:idx + 1], n_hold, axis=0))
+            frame_labels.extend([label] * n_hold)
+            if idx + 1 < len(labels):
+                x = (np.arange(1, n_move + 1) / (n_move + 1))[:, None]
+                s = 3 * x ** 2 - 2 * x ** 3
+                curls.append((1 - s) * poses[idx] + s * poses[idx + 1])
+                frame_labels.extend([labels[idx + 1]] * n_move)
+        curls = np.concatenate(curls)
+        hands = self.place(hand_kinematics(curls[..., None] * MAX_FLEXION), shared=True)
+        return np.arange(len(curls)) / fps, hands, np.array(frame_labels)
+
+    def generate(self, n, pose=None, ambiguous_fraction=0.):
+        """Generates n random hands.
+
+        Args:
+            n (int): Number of hands.
+            pose (str, optional): Only generate this pose (rock, paper or scissors); random poses by default.
+            ambiguous_fraction (float): Fraction of hands in an in-between pose.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Landmarks (N, 21, 3) and labels (indices into LABELS, AMBIGUOUS for in-between hands).
+        """
+        if pose is not None:
+            labels = np.full(n, LABELS.index(pose))
+        else:
+            labels = self.rng.integers(0, len(LABELS), n)
+        labels[self.rng.random(n) < ambiguous_fraction] = AMBIGUOUS
+        return self.from_curls(self.curls(labels)), labels
+
+
+def to_protobuf(hand):
+    """Turns a (21, 3) array into a Mediapipe NormalizedLandmarkList, as found in results.multi_hand_landmarks."""
+    from mediapipe.framework.formats import landmark_pb2
+
+    landmark_list = landmark_pb2.NormalizedLandmarkList()
+    for x, y, z in hand:
+        landmark_list.landmark.add(x=float(x), y=float(y), z=float(z))
+    return landmark_list
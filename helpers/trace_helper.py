@@ -0,0 +1,159 @@
+"""Glass-to-servo latency tracing.
+
+Every frame that enters a ``recv`` gets a trace id derived from its session and
+capture timestamp. The id is kept as the "current" trace of the processing thread, so
+``VideoProcessor.process``, the classifier, the command path and
+``ArduinoLink.write`` can all record spans without passing the id around.
+"""
+
+import itertools
+import json
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+
+class Span:
+    """A single timed stage of a traced frame."""
+
+    __slots__ = ('trace_id', 'name', 'start', 'end', 'thread_id')
+
+    def __init__(self, trace_id, name, start, end, thread_id):
+        self.trace_id = trace_id
+        self.name = name
+        self.start = start
+        self.end = end
+        self.thread_id = thread_id
+
+    @property
+    def duration(self):
+        return self.end - self.start
+
+
+class Tracer:
+    """
+    Collects spans per frame and reports end-to-end latencies.
+    The tracer is disabled by default so the hot path only pays for
+    a boolean check.
+    """
+
+    def __init__(self, enabled=False, max_spans=20000):
+        self.enabled = enabled
+        self.spans = deque(maxlen=max_spans)
+        self._frames = {}
+        self._frame_order = deque()
+        self._max_frames = max_spans
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._sessions = itertools.count()
+
+    def new_session(self):
+        """A new session id for start_frame, so sessions sharing a thread get distinct trace ids."""
+        return next(self._sessions)
+
+    def start_frame(self, frame=None, session=None):
+        """Starts a new trace for a frame and makes it the current trace of this thread.
+
+        Args:
+            frame (av.VideoFrame, optional): Frame to take the capture pts/time from.
+            session (int, optional): Id from new_session of the session the frame belongs to.
+
+        Returns:
+            str: The trace id, or None when tracing is disabled.
+        """
+        if not self.enabled:
+            return None
+
+        now = time.perf_counter()
+        pts = getattr(frame, 'pts', None)
+        frame_time = getattr(frame, 'time', None)
+        trace_id = f'{session}:{threading.get_ident()}:{pts if pts is not None else now}'
+
+        with self._lock:
+            self._frames[trace_id] = {'start': now, 'pts': pts, 'time': frame_time, 'end': None}
+            self._frame_order.append(trace_id)
+            if len(self._frame_order) > self._max_frames:
+                self._frames.pop(self._frame_order.popleft(), None)
+        self._local.trace_id = trace_id
+        return trace_id
+
+    def end_frame(self, trace_id=None):
+        """Closes the end-to-end span of a frame (defaults to the current trace)."""
+        if not self.enabled:
+            return
+        trace_id = trace_id or self.current()
+        now = time.perf_counter()
+        with self._lock:
+            frame = self._frames.get(trace_id)
+            if frame is not None:
+                frame['end'] = now
+        if trace_id is not None:
+            self.spans.append(Span(trace_id, 'recv', frame['start'] if frame else now, now,
+                                   threading.get_ident()))
+        self._local.trace_id = None
+
+    def current(self):
+        return getattr(self._local, 'trace_id', None)
+
+    @contextmanager
+    def span(self, name):
+        """Times the enclosed block as a stage of the current trace."""
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.spans.append(Span(self.current(), name, start, time.perf_counter(),
+                                   threading.get_ident()))
+
+    def glass_to_servo(self):
+        """Returns the latency from frame arrival until the serial write for every commanded frame.
+
+        Returns:
+            Dict[str, float]: Latencies in seconds, keyed by trace id.
+        """
+        return {trace_id: latency for trace_id, _, latency in self._command_latencies()}
+
+    def _command_latencies(self):
+        with self._lock:
+            starts = {trace_id: frame['start'] for trace_id, frame in self._frames.items()}
+        latencies = []
+        for span in list(self.spans):
+            if span.name == 'serial_write' and span.trace_id in starts:
+                start = starts[span.trace_id]
+                latencies.append((span.trace_id, start, span.end - start))
+        return latencies
+
+    def export_chrome_trace(self, path):
+        """Writes all spans as Chrome trace-event JSON (open with chrome://tracing or Perfetto)."""
+        events = []
+        for span in list(self.spans):
+            events.append({
+                'name': span.name,
+                'cat': 'rps',
+                'ph': 'X',
+                'ts': span.start * 1e6,
+                'dur': span.duration * 1e6,
+                'pid': 0,
+                'tid': span.thread_id,
+                'args': {'trace_id': span.trace_id},
+            })
+        for trace_id, start, latency in self._command_latencies():
+            events.append({
+                'name': 'glass_to_servo',
+                'cat': 'rps',
+                'ph': 'C',
+                'ts': start * 1e6,
+                'pid': 0,
+                'args': {'latency_ms': latency * 1e3},
+            })
+
+        with open(path, 'w') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+        return path
+
+
+TRACER = Tracer()
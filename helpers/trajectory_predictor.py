@@ -0,0 +1,149 @@
+"""Early rock/paper/scissors prediction from the trend of the finger angles, before the hand settles."""
+
+import bisect
+import math
+from collections import namedtuple
+
+import numpy as np
+
+from classification import top_bottom_angles
+
+EarlyPrediction = namedtuple('EarlyPrediction', ['pred', 'confidence', 'top_angle', 'bottom_angle'])
+
+
+class TrajectoryPredictor(object):
+    """
+    Keeps the top and bottom finger angles of the last frames of one session, fits
+    them with a quadratic (angle, velocity and acceleration) and extrapolates
+    horizon seconds ahead, stopping where a decelerating finger comes to rest.
+    The extrapolated angles are classified with the AngleClassifier cutoffs.
+
+    The confidence is the chance that both extrapolated angles lie on the predicted
+    side of their cutoff, assuming Gaussian errors of angle_noise degrees plus the
+    fit residual plus a fraction of the extrapolated movement.
+
+    Args:
+        classifier (AngleClassifier): Gives the cutoffs and the angle rule.
+        history (int): Number of frames to fit.
+        horizon (float): Seconds to extrapolate.
+        min_confidence (float): Confidence below which update returns None.
+        max_gap (float): Seconds without a hand after which the history is dropped.
+    """
+
+    def __init__(self, classifier, history=5, horizon=0.15, min_confidence=0.9, angle_noise=6.,
+                 movement_uncertainty=0.3, max_gap=0.25):
+        self.classifier = classifier
+        self.history = history
+        self.horizon = horizon
+        self.min_confidence = min_confidence
+        self.angle_noise = angle_noise
+        self.movement_uncertainty = movement_uncertainty
+        self.max_gap = max_gap
+        self.times = np.zeros(history)
+        self.angles = np.zeros((history, 2))
+        self.count = 0
+
+    def reset(self):
+        """Forgets the history, e.g. when the hand is lost."""
+        self.count = 0
+
+    def extrapolate(self):
+        """Extrapolated (top, bottom) angles and their standard deviation, from the current history."""
+        n = min(self.count, self.history)
+        now = self.times[(self.count - 1) % self.history]
+        t = self.times[:n] - now  # the order of the ring buffer doesn't matter to the fit
+        coeffs = np.polyfit(t, self.angles[:n], 2)  # (3, 2): half the acceleration, velocity, angle at now
+        acceleration, velocity, angle = 2 * coeffs[0], coeffs[1], coeffs[2]
+
+        # A finger that decelerates comes to rest before the horizon
+        horizon = np.full(2, self.horizon)
+        settling = acceleration * velocity < 0
+        horizon[settling] = np.minimum(self.horizon, -velocity[settling] / acceleration[settling])
+        future = np.clip(angle + velocity * horizon + 0.5 * acceleration * horizon ** 2, 0., 180.)
+
+        residual = (self.angles[:n] - np.polyval(coeffs, t[:, None])).std(axis=0)
+        sigma = self.angle_noise + residual + self.movement_uncertainty * np.abs(future - angle)
+        return future, sigma
+
+    def update(self, now, landmarks):
+        """Adds the hand of the frame at now and predicts the hand it is moving to.
+
+        Args:
+            now (float): Timestamp in seconds.
+            landmarks (np.ndarray): Landmark array of shape (21, 3).
+
+        Returns:
+            EarlyPrediction: The predicted hand, or None without enough history or confidence.
+        """
+        if self.count and now - self.times[(self.count - 1) % self.history] > self.max_gap:
+            self.reset()
+        idx = self.count % self.history
+        self.times[idx] = now
+        self.angles[idx] = top_bottom_angles(landmarks)
+        self.count += 1
+        if self.count < 3:
+            return None
+
+        future, sigma = self.extrapolate()
+        cutoffs = np.array([self.classifier.angle_cutoff, self.classifier.bottom_angle_cutoff])
+        z = np.abs(future - cutoffs) / sigma
+        confidence = float(np.prod([0.5 * (1 + math.erf(value / math.sqrt(2))) for value in z]))
+        if confidence < self.min_confidence:
+            return None
+        return EarlyPrediction(self.classifier.classify_angles(*future), confidence, float(future[0]), float(future[1]))
+
+
+def settled_segments(preds, settle=3):
+    """Runs of at least settle equal predictions, as (first frame, last frame + 1, prediction)."""
+    segments = []
+    start = 0
+    for idx in range(1, len(preds) + 1):
+        if idx == len(preds) or preds[idx] != preds[start]:
+            if idx - start >= settle:
+                segments.append((start, idx, preds[start]))
+            start = idx
+    return segments
+
+
+def evaluate_early(times, landmarks, predictor, settle=3):
+    """Runs a predictor over a recorded hand sequence and compares it with the frame-by-frame classifier.
+
+    Every change between settled segments of the frame-by-frame predictions is a move.
+    A move is anticipated when the predictor announced its hand before the frame-by-frame
+    classifier first showed it; the lead is the time in between. A speculative prediction
+    (one that differs from the frame-by-frame hand) is correct when it matches the next
+    settled hand.
+
+    Returns:
+        dict: moves, anticipated, leads (seconds), speculative and correct counts.
+    """
+    top, bottom = top_bottom_angles(landmarks)
+    baseline = [predictor.classifier.classify_angles(t, b) for t, b in zip(top, bottom)]
+    predictor.reset()
+    early = []
+    for now, hand in zip(times, landmarks):
+        prediction = predictor.update(now, hand)
+        early.append(prediction.pred if prediction else None)
+
+    segments = settled_segments(baseline, settle)
+    result = {'moves': 0, 'anticipated': 0, 'leads': [], 'speculative': 0, 'correct': 0}
+    for previous, current in zip(segments, segments[1:]):
+        if previous[2] == current[2]:
+            continue
+        result['moves'] += 1
+        # The move starts where the frame-by-frame classifier first shows the new hand
+        first = next(idx for idx in range(previous[1], current[0] + 1) if baseline[idx] == current[2])
+        for idx in range(previous[0], first):
+            if early[idx] == current[2]:
+                result['anticipated'] += 1
+                result['leads'].append(times[first] - times[idx])
+                break
+
+    starts = [segment[0] for segment in segments]
+    for idx, pred in enumerate(early):
+        if pred is None or pred == baseline[idx]:
+            continue
+        result['speculative'] += 1
+        following = bisect.bisect_right(starts, idx)  # the next settled segment
+        result['correct'] += following < len(segments) and segments[following][2] == pred
+    return result
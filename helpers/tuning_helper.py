@@ -0,0 +1,220 @@
+"""Offline tuning of the classification thresholds on labelled landmark recordings."""
+
+import itertools
+import os
+import random
+from multiprocessing import Pool
+
+import numpy as np
+
+from classification import LinearClassifier, landmark_features, top_bottom_angles
+from helpers.replay_helper import DEFAULT_SETTINGS, LABELS, find_inputs, label_for, run_video
+
+# Hands settings searched by the autotuner
+DETECTOR_GRID = {
+    'model_complexity': [0, 1],
+    'min_detection_confidence': [0.1, 0.3, 0.5, 0.7],
+    'min_tracking_confidence': [0.3, 0.5, 0.7, 0.9],
+}
+
+
+def load_labelled_landmarks(paths):
+    """Loads every labelled recorded session below the given paths.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: Landmarks of shape (N, 21, 3) and label indices into LABELS of shape (N,).
+    """
+    from helpers.session_recorder import load_session
+
+    landmarks, labels = [], []
+    for path in find_inputs(paths):
+        label = label_for(path)
+        if label is None or not (os.path.isdir(path) or path.endswith('.parquet')):
+            continue
+        session = load_session(path)
+        landmarks.append(session['landmarks'])
+        labels.append(np.full(len(session['landmarks']), LABELS.index(label), dtype=np.int64))
+
+    if not landmarks:
+        return np.empty((0, 21, 3), dtype=np.float32), np.empty(0, dtype=np.int64)
+    return np.concatenate(landmarks), np.concatenate(labels)
+
+
+def sweep_cutoffs(top_angles, bottom_angles, labels, top_cutoffs, bottom_cutoffs):
+    """Evaluates the AngleClassifier decision rule for every (top cutoff, bottom cutoff) pair at once.
+
+    Instead of classifying every sample for every pair, each sample is binned by how many
+    cutoffs it exceeds. A reversed 2D cumulative sum of that histogram then gives, for every
+    pair, how many samples have both, only one or neither finger group extended.
+
+    Args:
+        top_angles (np.ndarray): Average index/middle finger angle per sample.
+        bottom_angles (np.ndarray): Average ring/pink finger angle per sample.
+        labels (np.ndarray): Label index (into LABELS) per sample.
+        top_cutoffs (np.ndarray): Ascending top cutoffs to evaluate.
+        bottom_cutoffs (np.ndarray): Ascending bottom cutoffs to evaluate.
+
+    Returns:
+        np.ndarray: Confusion matrices of shape (len(top_cutoffs), len(bottom_cutoffs), 3, 3),
+            indexed [top cutoff, bottom cutoff, true label, predicted label].
+    """
+    top_cutoffs = np.asarray(top_cutoffs, dtype=np.float64)
+    bottom_cutoffs = np.asarray(bottom_cutoffs, dtype=np.float64)
+    valid = ~(np.isnan(top_angles) | np.isnan(bottom_angles))
+    top_angles, bottom_angles, labels = top_angles[valid], bottom_angles[valid], labels[valid]
+    n_top, n_bottom = len(top_cutoffs), len(bottom_cutoffs)
+
+    # A sample is extended for cutoff i if i < its bin (angle >= cutoff)
+    top_bins = np.searchsorted(top_cutoffs, top_angles, side='right')
+    bottom_bins = np.searchsorted(bottom_cutoffs, bottom_angles, side='right')
+    flat = (labels * (n_top + 1) + top_bins) * (n_bottom + 1) + bottom_bins
+    hist = np.bincount(flat, minlength=len(LABELS) * (n_top + 1) * (n_bottom + 1))
+    hist = hist.reshape(len(LABELS), n_top + 1, n_bottom + 1)
+
+    # at_least[l, i, j] = samples of label l with top bin >= i and bottom bin >= j
+    at_least = hist[:, ::-1, ::-1].cumsum(axis=1).cumsum(axis=2)[:, ::-1, ::-1]
+    total = at_least[:, 0, 0][:, None, None]
+    top_extended = at_least[:, 1:, 0][:, :, None]
+    bottom_extended = at_least[:, 0, 1:][:, None, :]
+    both_extended = at_least[:, 1:, 1:]
+
+    paper = both_extended
+    scissors = top_extended + bottom_extended - 2 * both_extended
+    rock = total - top_extended - bottom_extended + both_extended
+
+    predictions = [None] * len(LABELS)
+    predictions[LABELS.index('rock')] = rock
+    predictions[LABELS.index('paper')] = paper
+    predictions[LABELS.index('scissors')] = scissors
+    return np.stack(predictions, axis=-1).transpose(1, 2, 0, 3)
+
+
+def accuracy(confusion):
+    """Accuracy of (a grid of) confusion matrices with true labels on axis -2 and predictions on axis -1."""
+    correct = np.trace(confusion, axis1=-2, axis2=-1)
+    total = confusion.sum(axis=(-2, -1))
+    return np.divide(correct, total, out=np.zeros(correct.shape), where=total > 0)
+
+
+def confusion_matrix(labels, predictions):
+    """Confusion matrix with true labels on the rows and predictions on the columns (indices into LABELS)."""
+    flat = np.asarray(labels) * len(LABELS) + np.asarray(predictions)
+    return np.bincount(flat, minlength=len(LABELS) ** 2).reshape(len(LABELS), len(LABELS))
+
+
+def train_linear_classifier(landmarks, labels, l2=1e-3, steps=1000, learning_rate=0.5):
+    """Fits a LinearClassifier by full-batch gradient descent on the L2-regularized cross-entropy.
+
+    Args:
+        landmarks (np.ndarray): Hands of shape (N, 21, 3).
+        labels (np.ndarray): Label indices into LABELS of shape (N,).
+
+    Returns:
+        LinearClassifier: The trained classifier.
+    """
+    features = landmark_features(landmarks)
+    mean, scale = features.mean(axis=0), features.std(axis=0) + 1e-6
+    x = (features - mean) / scale
+    targets = np.eye(len(LABELS))[labels]
+
+    weights = np.zeros((x.shape[1], len(LABELS)))
+    bias = np.zeros(len(LABELS))
+    for _ in range(steps):
+        logits = x @ weights + bias
+        logits -= logits.max(axis=1, keepdims=True)
+        probabilities = np.exp(logits)
+        probabilities /= probabilities.sum(axis=1, keepdims=True)
+        error = (probabilities - targets) / len(x)
+        weights -= learning_rate * (x.T @ error + l2 * weights)
+        bias -= learning_rate * error.sum(axis=0)
+    return LinearClassifier(weights, bias, mean, scale, labels=LABELS)
+
+
+def grid_candidates(grid=DETECTOR_GRID):
+    """Every combination of the detector settings in the grid."""
+    names = list(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*grid.values())]
+
+
+def random_candidates(n, seed=0):
+    """n random detector settings within the ranges of the grid."""
+    rng = random.Random(seed)
+    return [{
+        'model_complexity': rng.choice(DETECTOR_GRID['model_complexity']),
+        'min_detection_confidence': round(rng.uniform(0.05, 0.95), 2),
+        'min_tracking_confidence': round(rng.uniform(0.05, 0.95), 2),
+    } for _ in range(n)]
+
+
+def _detect(args):
+    path, candidate, max_frames = args
+    latencies, _, landmarks, _ = run_video(path, dict(DEFAULT_SETTINGS, **candidate), max_frames)
+    return np.asarray(latencies), landmarks
+
+
+def autotune(videos, candidates, cutoffs, workers=None, max_frames=None, timing_frames=100):
+    """Evaluates detector settings on labelled videos, with every (candidate, video) run in a process pool.
+
+    The angle cutoff does not change what the detector sees, so each video only goes through the
+    detector once per candidate and all cutoffs are then evaluated with sweep_cutoffs. Accuracy is
+    measured over all frames, so frames where the hand was missed count as wrong.
+
+    The pool's workers compete for the CPU, which skews the latencies being compared. Unless
+    workers is 1, the latencies are therefore measured again one candidate at a time, over the
+    first timing_frames frames of every video.
+
+    Returns:
+        List[dict]: One result per candidate that saw any frames, with its best cutoff, accuracy and latency percentiles.
+    """
+    videos = [video for video in videos if label_for(video) is not None]
+    if not videos:
+        return []
+    jobs = [(video, candidate, max_frames) for candidate in candidates for video in videos]
+    with Pool(processes=workers) as pool:
+        outputs = pool.map(_detect, jobs, chunksize=1)
+    timings = [latencies for latencies, _ in outputs]
+    if workers != 1:
+        timing_frames = timing_frames if max_frames is None else min(max_frames, timing_frames)
+        timings = [_detect((video, candidate, timing_frames))[0] for video, candidate, _ in jobs]
+
+    cutoffs = np.asarray(cutoffs, dtype=np.float64)
+    results = []
+    for idx, candidate in enumerate(candidates):
+        runs = outputs[idx * len(videos):(idx + 1) * len(videos)]
+        frames = sum(len(latencies) for latencies, _ in runs)
+        if not frames:
+            continue
+        latencies = np.concatenate(timings[idx * len(videos):(idx + 1) * len(videos)]) * 1000
+        landmarks = np.concatenate([landmarks for _, landmarks in runs])
+        labels = np.concatenate([np.full(len(landmarks), LABELS.index(label_for(video)))
+                                 for video, (_, landmarks) in zip(videos, runs)]).astype(np.int64)
+
+        top_angles, bottom_angles = top_bottom_angles(landmarks)
+        confusion = sweep_cutoffs(top_angles, bottom_angles, labels, cutoffs, cutoffs)
+        correct = np.diagonal(np.trace(confusion, axis1=-2, axis2=-1))
+        best = int(np.argmax(correct))
+        results.append(dict(
+            candidate,
+            angle_cutoff=float(cutoffs[best]),
+            accuracy=float(correct[best] / frames),
+            detection_rate=len(labels) / frames,
+            latency_p50_ms=float(np.percentile(latencies, 50)),
+            latency_p90_ms=float(np.percentile(latencies, 90)),
+        ))
+    return results
+
+
+def pareto_frontier(results, latency_key='latency_p90_ms'):
+    """The results that no other result beats on both latency and accuracy, cheapest first."""
+    frontier = []
+    for result in sorted(results, key=lambda r: (r[latency_key], -r['accuracy'])):
+        if not frontier or result['accuracy'] > frontier[-1]['accuracy']:
+            frontier.append(result)
+    return frontier
+
+
+def choose(results, tolerance=0.01, latency_key='latency_p90_ms'):
+    """The cheapest result whose accuracy is within tolerance of the most accurate one."""
+    best_accuracy = max(result['accuracy'] for result in results)
+    acceptable = [result for result in results if result['accuracy'] >= best_accuracy - tolerance]
+    return min(acceptable, key=lambda r: r[latency_key])
@@ -1,13 +1,17 @@
 import logging
 import time
 from datetime import datetime
-from threading import Thread
+from threading import Condition, Lock, Thread
 from typing import List
 
 import cv2
 import mediapipe as mp
 import numpy as np
 
+from classification import HandFeatures, landmarks_to_array
+from helpers.camera_helper import discover_cameras
+from helpers.trace_helper import TRACER
+
 logging.basicConfig(level=logging.INFO, format='%(asctime)s %(threadName)s %(message)s')
 
 
@@ -34,34 +38,200 @@ class CountsPerSec:
         return self._num_occurrences / elapsed_time if elapsed_time > 0 else 0
 
 
+CAPTURE_BACKENDS = {
+    'any': cv2.CAP_ANY,
+    'v4l2': cv2.CAP_V4L2,
+    'gstreamer': cv2.CAP_GSTREAMER,
+    'ffmpeg': cv2.CAP_FFMPEG,
+    'dshow': cv2.CAP_DSHOW,
+    'msmf': cv2.CAP_MSMF,
+    'avfoundation': cv2.CAP_AVFOUNDATION,
+}
+
+
+def open_capture(src=0, profile=None):
+    """Opens a VideoCapture with the settings of a capture profile (see CAPTURE_PROFILES in config.py).
+
+    The format is set before the resolution, since V4L2 picks the available
+    resolutions and frame rates per format.
+    """
+    profile = profile or {}
+    stream = cv2.VideoCapture(src, CAPTURE_BACKENDS[profile.get('backend', 'any')])
+    if 'fourcc' in profile:
+        stream.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*profile['fourcc']))
+    if 'width' in profile:
+        stream.set(cv2.CAP_PROP_FRAME_WIDTH, profile['width'])
+    if 'height' in profile:
+        stream.set(cv2.CAP_PROP_FRAME_HEIGHT, profile['height'])
+    if 'fps' in profile:
+        stream.set(cv2.CAP_PROP_FPS, profile['fps'])
+    if 'buffer_size' in profile:
+        stream.set(cv2.CAP_PROP_BUFFERSIZE, profile['buffer_size'])
+    if profile.get('exposure') is not None:
+        stream.set(cv2.CAP_PROP_AUTO_EXPOSURE, 1)  # manual exposure on V4L2 (3 is auto)
+        stream.set(cv2.CAP_PROP_EXPOSURE, profile['exposure'])
+    return stream
+
+
+def capture_settings(stream):
+    """The settings a VideoCapture actually runs with, which can differ from the profile that asked for them."""
+    fourcc = int(stream.get(cv2.CAP_PROP_FOURCC))
+    return {
+        'backend': stream.getBackendName() if stream.isOpened() else None,
+        'fourcc': ''.join(chr((fourcc >> 8 * i) & 0xFF) for i in range(4)) if fourcc else None,
+        'width': int(stream.get(cv2.CAP_PROP_FRAME_WIDTH)),
+        'height': int(stream.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+        'fps': stream.get(cv2.CAP_PROP_FPS),
+        'buffer_size': int(stream.get(cv2.CAP_PROP_BUFFERSIZE)),
+        'exposure': stream.get(cv2.CAP_PROP_EXPOSURE),
+    }
+
+
 class VideoGetter:
     """
     Class that continuously gets frames from a VideoCapture object
     with a dedicated thread.
+
+    Frames are decoded straight into a preallocated ring buffer of buffer_size
+    slots. Every frame gets a sequence number (1, 2, ...) and a capture timestamp
+    (time.perf_counter). The capture thread publishes a frame by bumping self.seq
+    after the slot is written, so readers never need a lock and never see a
+    partially written frame. A frame returned by latest or wait_for_newer is a
+    view into the buffer and stays valid until buffer_size - 1 newer frames are
+    captured; copy it to keep it longer.
     """
 
-    def __init__(self, src=0):
+    def __init__(self, src=0, buffer_size=4, profile=None):
         self.logger = logging.getLogger('VideoGetter')
-        self.stream = cv2.VideoCapture(src)
-        self.stream.set(cv2.CAP_PROP_FPS, 100)
-        cv2.namedWindow('Video', cv2.WINDOW_FULLSCREEN)
-        (self.grabbed, self.frame) = self.stream.read()
+        self.stream = open_capture(src, profile or {'fps': 100})
+        self.buffer_size = max(buffer_size, 2)  # the slot being written is never the newest one
+        self.frames = None
+        self.timestamps = np.zeros(self.buffer_size)
+        self.seq = 0  # sequence number of the newest frame, 0 while there is none
+        # Frames the consumer never saw and reads that returned an already seen frame
+        self.dropped = 0
+        self.duplicates = 0
+        self._new_frame = Condition()
         self.stopped = False
 
+        (self.grabbed, frame) = self.stream.read()
+        if self.grabbed:
+            self._allocate(frame)
+            self.frames[1][...] = frame
+            self._publish()
+
+    def _allocate(self, frame):
+        self.frames = np.empty((self.buffer_size,) + frame.shape, dtype=frame.dtype)
+
+    def _publish(self):
+        self.timestamps[(self.seq + 1) % self.buffer_size] = time.perf_counter()
+        self.seq += 1
+        with self._new_frame:
+            self._new_frame.notify_all()
+
     def start(self):
-        Thread(target=self.get, args=()).start()
+        self.thread = Thread(target=self.get, args=(), daemon=True)
+        self.thread.start()
         return self
 
     def get(self):
         while not self.stopped:
-            if not self.grabbed or self.frame is None:
+            if not self.grabbed or self.frames is None:
                 self.logger.error("Can't find image! Perhaps camera is disconnected?")
                 self.stop()
-            else:
-                (self.grabbed, self.frame) = self.stream.read()
+                break
+            slot = self.frames[(self.seq + 1) % self.buffer_size]
+            (self.grabbed, frame) = self.stream.read(slot)
+            if not self.grabbed:
+                continue
+            if frame is not slot:  # the resolution changed, frames in the buffer are lost
+                self._allocate(frame)
+                self.frames[(self.seq + 1) % self.buffer_size][...] = frame
+            self._publish()
+        self.stream.release()
+
+    def _read(self, last_seq):
+        seq = self.seq
+        if seq == 0:
+            return None
+        if last_seq is not None:
+            if seq == last_seq:
+                self.duplicates += 1
+            elif last_seq > 0:
+                self.dropped += seq - last_seq - 1
+        idx = seq % self.buffer_size
+        return seq, self.timestamps[idx], self.frames[idx]
+
+    def latest(self, last_seq=None):
+        """Returns the newest frame without waiting.
+
+        Args:
+            last_seq (int, optional): Sequence number of the frame the consumer saw last,
+                to count dropped and duplicate frames.
+
+        Returns:
+            Tuple[int, float, np.ndarray]: Sequence number, capture timestamp and frame,
+                or None before the first frame.
+        """
+        return self._read(last_seq)
+
+    def wait_for_newer(self, seq, timeout=None):
+        """Blocks until a frame newer than seq was captured and returns the newest one
+        like latest, or None on timeout or when the getter stopped.
+        """
+        if self.seq <= seq:
+            with self._new_frame:
+                self._new_frame.wait_for(lambda: self.seq > seq or self.stopped, timeout)
+            if self.seq <= seq:
+                return None
+        return self._read(seq)
+
+    @property
+    def frame(self):
+        """The newest frame, or None before the first frame."""
+        newest = self._read(None)
+        return newest[2] if newest else None
 
     def stop(self):
         self.stopped = True
+        with self._new_frame:
+            self._new_frame.notify_all()
+
+
+class DetectorPool:
+    """
+    Warmed-up hand detectors waiting for a session, per detector setting
+    (model complexity, detection and tracking confidence). Taking one builds
+    and warms a replacement in the background, so every new session starts
+    with a detector whose graph is already initialized. Callers that shouldn't
+    pay for (or be timed alongside) that rebuild take with replenish=False.
+    """
+
+    def __init__(self):
+        self.detectors = {}
+        self.builders = {}
+        self.lock = Lock()
+
+    def fill(self, key, build):
+        """Adds a detector made by build() (which should warm it up) for the setting key."""
+        detector = build()
+        with self.lock:
+            self.builders[key] = build
+            self.detectors.setdefault(key, []).append(detector)
+
+    def take(self, key, replenish=True):
+        """A warm detector for the setting key, or None when there is none."""
+        with self.lock:
+            if not self.detectors.get(key):
+                return None
+            detector = self.detectors[key].pop()
+            build = self.builders[key]
+        if replenish:
+            Thread(target=self.fill, args=(key, build), daemon=True).start()
+        return detector
+
+
+DETECTOR_POOL = DetectorPool()
 
 
 class VideoProcessor:
@@ -72,29 +242,140 @@ class VideoProcessor:
 
     def __init__(self, classifier, model_complexity=1, min_detection_confidence=0.5,\
                 min_tracking_confidence=0.5, paper_color_intensity=1.5, scissor_color_intensity=1, \
-                rock_color_intensity=1):
+                rock_color_intensity=1, recorder=None, quality_controller=None, draw=True, smoother=None, \
+                replenish_pool=True):
         self.logger = logging.getLogger('VideoProcessor')
         self.mp_hands = mp.solutions.hands
-        self.hand_detector = self.mp_hands.Hands(
-                model_complexity=model_complexity,
-                static_image_mode=False,
-                max_num_hands=1,
-                min_detection_confidence=min_detection_confidence,
-                min_tracking_confidence=min_tracking_confidence
-        )
+        self.model_complexity = model_complexity
+        self.min_detection_confidence = min_detection_confidence
+        self.min_tracking_confidence = min_tracking_confidence
+        # replenish_pool=False takes a pooled detector without building its replacement
+        self.hand_detector = self._build_detector(model_complexity, replenish=replenish_pool)
+        self._detector_lock = Lock()
+        # Serializes detector swaps; _detector_complexity is the complexity of the installed detector
+        self._swap_lock = Lock()
+        self._detector_complexity = model_complexity
+        # Fraction of the frame size used for detection and number of frames to skip between detections
+        self.inference_scale = 1.
+        self.frame_skip = 0
+        self.frame_idx = 0
+        self.last_detection = None
+        # Number of processed frames, and whether the last one ran the detector (not reusing a skipped frame's)
+        self.frames = 0
+        self.fresh_detection = False
+        self.quality_controller = quality_controller
+        # Whether to draw the detected landmarks on the frame
+        self.draw = draw
         self.mp_drawing = mp.solutions.drawing_utils
         self.classifier = classifier
         self.stopped = False
         self.paper_color_intensity = paper_color_intensity
         self.scissor_color_intensity = scissor_color_intensity
         self.rock_color_intensity = rock_color_intensity
+        self.recorder = recorder
+        # Landmark filter (e.g. OneEuroFilter) applied before classification and drawing
+        self.smoother = smoother
+        self._smoothed_detection = None
+        # Stage timings (seconds) and outputs of the last processed frame
+        self.timings = {'detect': 0., 'classify': 0., 'draw': 0.}
+        self.last_landmarks = None
+        self.last_pred = None
+        self.last_scores = None
+        self._last_result = None
+        self._last_color = None
+
+    def _build_detector(self, model_complexity, replenish=True):
+        key = (model_complexity, self.min_detection_confidence, self.min_tracking_confidence)
+        detector = DETECTOR_POOL.take(key, replenish=replenish)
+        if detector is not None:
+            return detector
+        return self.mp_hands.Hands(
+                model_complexity=model_complexity,
+                static_image_mode=False,
+                max_num_hands=1,
+                min_detection_confidence=self.min_detection_confidence,
+                min_tracking_confidence=self.min_tracking_confidence
+        )
 
-    def process(self, frame):
-        start_hand = time.time()
-        results = self.hand_detector.process(frame)
-        self.logger.debug(f'hand: {time.time() - start_hand}')
-
-        if not results.multi_hand_landmarks:
+    def set_quality(self, model_complexity=None, inference_scale=None, frame_skip=None):
+        """Changes the detection quality without interrupting the stream.
+
+        A new model complexity is loaded in a background thread while the current
+        detector keeps processing frames, and swapped in once it is ready. Swaps run
+        one at a time, and a swap that was overtaken by a newer change is dropped.
+        """
+        if inference_scale is not None:
+            self.inference_scale = inference_scale
+        if frame_skip is not None:
+            self.frame_skip = frame_skip
+        if model_complexity is not None and model_complexity != self.model_complexity:
+            self.model_complexity = model_complexity
+            Thread(target=self._swap_detector, args=(model_complexity,), daemon=True).start()
+
+    @property
+    def swap_pending(self):
+        """Is a detector for a new model complexity still being built?"""
+        return self.model_complexity != self._detector_complexity
+
+    def _swap_detector(self, model_complexity):
+        with self._swap_lock:
+            if model_complexity != self.model_complexity or model_complexity == self._detector_complexity:
+                return
+            # Mid-session swaps don't need a replacement waiting for the next session
+            hand_detector = self._build_detector(model_complexity, replenish=False)
+            if model_complexity != self.model_complexity:  # changed again while building
+                hand_detector.close()
+                return
+            with self._detector_lock:
+                old_detector, self.hand_detector = self.hand_detector, hand_detector
+                self._detector_complexity = model_complexity
+                self.last_detection = None
+                old_detector.close()
+
+    def _detect(self, frame):
+        self.frame_idx += 1
+        if self.frame_skip and self.frame_idx % (self.frame_skip + 1):
+            self.timings['detect'] = 0.
+            self.fresh_detection = False
+            return self.last_detection
+
+        if self.inference_scale != 1:
+            frame = cv2.resize(frame, None, fx=self.inference_scale, fy=self.inference_scale,
+                               interpolation=cv2.INTER_AREA)
+
+        start_hand = time.perf_counter()
+        with TRACER.span('detect'), self._detector_lock:
+            self.last_detection = self.hand_detector.process(frame)
+        self.timings['detect'] = time.perf_counter() - start_hand
+        self.fresh_detection = True
+        self.logger.debug('hand: %s', self.timings['detect'])
+        return self.last_detection
+
+    def process(self, frame, timestamp=None):
+        """Detects and classifies the hand in a frame. timestamp (seconds, e.g. the mode's clock or the
+        position in a video file) is when the frame was captured; the landmark smoother runs on it,
+        so replays smooth like the live stream whatever speed they are processed at."""
+        self.frames += 1
+        start = time.perf_counter()
+        results = self._process(frame, time.monotonic() if timestamp is None else timestamp)
+        # Frames reusing a skipped detection say nothing about the cost of the current quality level
+        if self.quality_controller is not None and self.fresh_detection:
+            self.quality_controller.update(self, time.perf_counter() - start)
+        return results
+
+    def _process(self, frame, timestamp):
+        self.timings['classify'] = self.timings['draw'] = 0.
+        self.last_landmarks = None
+        self.last_pred = None
+        self.last_scores = None
+
+        results = self._detect(frame)
+
+        if results is None or not results.multi_hand_landmarks:
+            if self.smoother is not None:
+                self.smoother.reset()
+            if hasattr(self.classifier, 'reset'):  # e.g. a DeltaGate must not reuse the lost hand
+                self.classifier.reset()
             return
 
         if len(results.multi_hand_landmarks) > 1:
@@ -102,31 +383,83 @@ class VideoProcessor:
             return
 
         hand_landmarks = results.multi_hand_landmarks[0]
-
-        start_detect = time.time()
-        topangle, bottomangle, pred, rockiness, paperiness, scissoriness = self.classifier.predict(hand_landmarks.landmark)
-
-        color = self.mp_drawing.DrawingSpec()
-        output_color = (
-            rockiness * self.rock_color_intensity, 
-            scissoriness * self.scissor_color_intensity, 
-            paperiness * self.paper_color_intensity
-        )
-        color.color = output_color
-
-        self.mp_drawing.draw_landmarks(
-            image=frame,
-            landmark_list=hand_landmarks,
-            connections=self.mp_hands.HAND_CONNECTIONS,
-            landmark_drawing_spec=color,
-            connection_drawing_spec=color,
-        )
-
-        self.logger.debug(f'detect: {time.time() - start_detect}')
+        if self.smoother is not None and results is not self._smoothed_detection:  # skipped frames reuse the detection
+            self._smooth(hand_landmarks, timestamp)
+            self._smoothed_detection = results
+
+        start_detect = time.perf_counter()
+        with TRACER.span('classify'):
+            # The landmark array is shared with classifiers that work on HandFeatures
+            hand = HandFeatures(hand_landmarks.landmark)
+            if hasattr(self.classifier, 'predict_hand'):
+                result = self.classifier.predict_hand(hand)
+            else:
+                result = self.classifier.predict(hand_landmarks.landmark)
+        topangle, bottomangle, pred, rockiness, paperiness, scissoriness = result
+        start_draw = time.perf_counter()
+        self.timings['classify'] = start_draw - start_detect
+        self.last_landmarks = hand.landmarks
+        self.last_pred = pred
+        self.last_scores = (rockiness, paperiness, scissoriness)
+        if self.recorder is not None and self.fresh_detection:  # skipped frames would repeat the last hand
+            self.recorder.record(self.last_landmarks, pred, topangle, bottomangle)
+
+        if result is not self._last_result:  # a DeltaGate hands back the same result for a still hand
+            self._last_result = result
+            self._last_color = (
+                rockiness * self.rock_color_intensity, 
+                scissoriness * self.scissor_color_intensity, 
+                paperiness * self.paper_color_intensity
+            )
+        output_color = self._last_color
+
+        if self.draw:
+            color = self.mp_drawing.DrawingSpec()
+            color.color = output_color
+            with TRACER.span('draw_landmarks'):
+                self.mp_drawing.draw_landmarks(
+                    image=frame,
+                    landmark_list=hand_landmarks,
+                    connections=self.mp_hands.HAND_CONNECTIONS,
+                    landmark_drawing_spec=color,
+                    connection_drawing_spec=color,
+                )
+
+        self.timings['draw'] = time.perf_counter() - start_draw
+        self.logger.debug('detect: %s', time.perf_counter() - start_detect)
         return topangle, bottomangle, pred, output_color
 
+    def _smooth(self, hand_landmarks, timestamp):
+        """Filters the detected landmarks in place, so classification and drawing see the smoothed hand."""
+        smoothed = self.smoother(timestamp, landmarks_to_array(hand_landmarks.landmark))
+        for landmark, (x, y, z) in zip(hand_landmarks.landmark, smoothed.tolist()):
+            landmark.x, landmark.y, landmark.z = x, y, z
+
     def close(self):
+        """Releases the detector and writes out the rest of the session recording."""
+        if self.stopped:
+            return
+        self.stopped = True
         self.hand_detector.close()
+        if self.recorder is not None:
+            self.recorder.close()
+
+
+def frame_to_ndarray(frame, max_width=None, max_height=None):
+    """Converts an av.VideoFrame to a bgr24 array, downscaling frames larger than
+    max_width x max_height (keeping the aspect ratio) in the same conversion pass.
+    """
+    scale = min(
+        1.,
+        max_width / frame.width if max_width else 1.,
+        max_height / frame.height if max_height else 1.,
+    )
+    if scale >= 1.:
+        return frame.to_ndarray(format="bgr24")
+    # Even dimensions keep the yuv420p encoder happy
+    width = max(2, int(frame.width * scale) // 2 * 2)
+    height = max(2, int(frame.height * scale) // 2 * 2)
+    return frame.to_ndarray(format="bgr24", width=width, height=height)
 
 
 class VideoShower:
@@ -134,9 +467,12 @@ class VideoShower:
     Class that continuously shows a frame using a dedicated thread.
     """
 
-    def __init__(self, frame=None):
+    def __init__(self, frame=None, fullscreen=False):
         self.frame = frame
         self.stopped = False
+        if fullscreen:
+            cv2.namedWindow("Video", cv2.WINDOW_NORMAL)
+            cv2.setWindowProperty("Video", cv2.WND_PROP_FULLSCREEN, cv2.WINDOW_FULLSCREEN)
 
     def show(self):
         if self.frame is None:
@@ -149,7 +485,7 @@ class VideoShower:
     def stop(self):
         self.stopped = True
 
-def search_for_camera() -> List[int]:
+def search_for_camera(cache_path=None) -> List[int]:
     """Will search for all connected cameras.
 
     Returns:
@@ -157,12 +493,9 @@ def search_for_camera() -> List[int]:
     """
     available_cameras = []
 
-    for camera_idx in range(20):
-        cap = cv2.VideoCapture(camera_idx)
-        if cap.isOpened():
-            print(f'Camera index available: {camera_idx}')
-            available_cameras.append(camera_idx)
-            cap.release()
+    for camera in discover_cameras(cache_path=cache_path):
+        print(f'Camera index available: {camera.index} ({camera.name}, {camera.usb_id})')
+        available_cameras.append(camera.index)
     if available_cameras:
         return available_cameras
     else:
@@ -0,0 +1,297 @@
+"""Game and freestyle mode video processors, shared by the web app, the kiosk, benchmarks and load tests."""
+
+import logging
+import time
+from abc import abstractmethod
+
+import av
+from streamlit_webrtc import VideoProcessorBase
+
+import config as cfg
+from classification import AngleClassifier
+from helpers.classifier_ensemble import (ClassifierEnsemble, build_classifier,
+                                         settings_from_config)
+from helpers.consensus import Consensus
+from helpers.delta_gate import DeltaGate
+from helpers.flight_recorder import FlightRecorder
+from helpers.game_state import (ALERT, COUNTDOWN, FREEZE, PLAY, FreestyleState,
+                                GameState)
+from helpers.gui_helper import (putAlert, putBottomAngle, putClassLabels,
+                                putCountDown, putDetection, putTopAngle)
+from helpers.landmark_filter import OneEuroFilter
+from helpers.quality_controller import QualityController
+from helpers.trace_helper import TRACER
+from helpers.trajectory_predictor import TrajectoryPredictor
+from helpers.video_helper import VideoProcessor, frame_to_ndarray
+
+
+def hand_message(video_processor, pred, output_color):
+    """Compact description of the landmark and detection overlays, to be rendered by the browser."""
+    return {
+        'type': 'hand',
+        'landmarks': video_processor.last_landmarks[:, :2].round(3).tolist(),
+        'pred': pred if cfg.DISPLAY_DETECTION else None,
+        'color': output_color,
+    }
+
+
+def mode_classifier(angle_cutoff):
+    """The classifier CLASSIFIER in config.py asks for, with its shadows; angle_cutoff is for the angle classifier."""
+    return build_classifier(settings_from_config(cfg, angle_cutoff))
+
+
+def landmark_smoother():
+    """A fresh landmark filter per session when SMOOTHING is set."""
+    return OneEuroFilter(cfg.SMOOTHING_MIN_CUTOFF, cfg.SMOOTHING_BETA) if cfg.SMOOTHING else None
+
+
+def session_recorder(mode):
+    """A SessionRecorder when RECORD_SESSIONS is set; pyarrow is only imported then."""
+    if not cfg.RECORD_SESSIONS:
+        return None
+    from helpers.session_recorder import SessionRecorder
+    return SessionRecorder(cfg.RECORDING_DIR, mode=mode)
+
+
+class ModeBase(VideoProcessorBase):
+    """
+    Plumbing shared by the modes: the Arduino link, the overlays, tracing and the
+    flight recorder. Frames come in either as av.VideoFrame through recv (WebRTC)
+    or as bgr24 arrays through recv_image (local camera).
+    """
+
+    def __init__(self, arduino_link=None, render=True, clock=time.monotonic):
+        """
+        With render=False nothing is drawn on the frames; what would have been
+        drawn is described in self.message instead, for the browser to render.
+        clock gives the timestamps the game timing runs on.
+        """
+        self.arduino_link = arduino_link
+        self.clock = clock
+        self.render = render
+        self.message = None
+        self.last_command = b''
+        self.trace_session = TRACER.new_session()
+        self.flight_recorder = FlightRecorder(
+            capacity=cfg.FLIGHT_RECORDER_CAPACITY,
+            latency_threshold=cfg.FLIGHT_RECORDER_LATENCY_THRESHOLD,
+            dump_dir=cfg.FLIGHT_RECORDER_DIR
+        )
+
+    def _annotate_image(self, frame, pred, topangle, bottomangle, output_color):
+        if not self.render:
+            self.message = hand_message(self.video_processor, pred, output_color)
+            return frame
+        if cfg.DISPLAY_ANGLES:
+            frame = putTopAngle(frame, topangle)
+            frame = putBottomAngle(frame, bottomangle)
+        if cfg.DISPLAY_CLASS_LABELS:
+            frame = putClassLabels(frame)
+        if cfg.VERBOSE:
+            logging.info(pred)
+        if cfg.DISPLAY_DETECTION:
+            frame = putDetection(frame, pred, output_color)
+
+        return frame
+
+    def _alert(self, frame):
+        if self.render:
+            return putAlert(frame)
+        self.message = {'type': 'alert'}
+        return frame
+
+    def _put_count_down(self, frame, count):
+        if self.render:
+            return putCountDown(frame, count)
+        self.message = {'type': 'countdown', 'count': count}
+        return frame
+
+    def _send(self, move):
+        with TRACER.span('command'):
+            self.last_command = move
+            self.arduino_link.write(move)
+
+    def recv(self, frame: av.VideoFrame) -> av.VideoFrame:
+        return self._instrumented(self._recv, frame)
+
+    def recv_image(self, frame):
+        """Runs the mode on a bgr24 array and returns the array to show."""
+        return self._instrumented(self._recv_image, frame)
+
+    def _instrumented(self, recv, frame):
+        TRACER.start_frame(frame, session=self.trace_session)
+        start = time.perf_counter()
+        self.last_command = b''
+        try:
+            frame = recv(frame)
+        except Exception:
+            self.flight_recorder.record_frame(self.video_processor, time.perf_counter() - start, self.last_command)
+            self.flight_recorder.dump(reason='exception', force=True)
+            raise
+        finally:
+            TRACER.end_frame()
+        self.flight_recorder.record_frame(self.video_processor, time.perf_counter() - start, self.last_command)
+        return frame
+
+    def _recv(self, frame: av.VideoFrame) -> av.VideoFrame:
+        frame = frame_to_ndarray(frame, max_width=cfg.VIDEO_WIDTH, max_height=cfg.VIDEO_HEIGHT)
+        return av.VideoFrame.from_ndarray(self._recv_image(frame), format="bgr24")
+
+    @abstractmethod
+    def _recv_image(self, frame):
+        """Runs the mode on a bgr24 array and returns the array to show."""
+
+    def on_ended(self):
+        """Called by streamlit-webrtc when the stream ends."""
+        self.close()
+
+    def close(self):
+        classifier = self.classifier
+        if isinstance(classifier, DeltaGate):
+            logging.info('delta gate: %s', classifier.counts)
+            classifier = classifier.classifier
+        if isinstance(classifier, ClassifierEnsemble):
+            for name, summary in classifier.summary().items():
+                logging.info('classifier %s: %s', name, summary)
+        self.video_processor.close()
+
+
+class GameMode(ModeBase):
+    def __init__(self, arduino_link=None, render=True, clock=time.monotonic):
+        """
+        Runs inference and visualization streaming pipeline.
+        """
+        super().__init__(arduino_link=arduino_link, render=render, clock=clock)
+        self.game = GameState(start=clock(), count_from=cfg.COUNT_FROM, delay=cfg.DELAY,
+                              too_fast_delay=cfg.TOO_FAST_DELAY)
+        self.freeze_frame = None
+        self.freeze_image = None
+        self.classifier = mode_classifier(cfg.ANGLE_CUTOFF_GAME)
+
+        self.video_processor = VideoProcessor(
+            classifier=self.classifier, \
+            model_complexity=cfg.MODEL_COMPLEXITY, \
+            min_detection_confidence=cfg.MIN_DETECTION_CONFIDENCE_GAME, \
+            min_tracking_confidence=cfg.MIN_TRACKING_CONFIDENCE_GAME, \
+            paper_color_intensity=cfg.PAPER_COLOR_INTENSITY, \
+            scissor_color_intensity=cfg.SCISSOR_COLOR_INTENSITY, \
+            rock_color_intensity=cfg.ROCK_COLOR_INTENSITY, \
+            recorder=session_recorder('game'), \
+            quality_controller=QualityController(cfg.QUALITY_LEVELS, cfg.LATENCY_BUDGET) if cfg.ADAPTIVE_QUALITY else None, \
+            draw=render, \
+            smoother=landmark_smoother()
+        )
+
+    def _recv(self, frame: av.VideoFrame) -> av.VideoFrame:
+        if self.game.frozen(self.clock()):  # still in delay period
+            return self.freeze_frame
+
+        frame = super()._recv(frame)
+        if self.game.frozen(self.clock()):  # this frame had the play
+            self.freeze_frame = frame
+        return frame
+
+    def _recv_image(self, frame):
+        now = self.clock()
+        results = self.video_processor.process(frame, timestamp=now) if self.game.wants_detection(now) else None  # detect hands
+        action = self.game.step(now, results[2] if results else None)
+
+        if action.kind == FREEZE:
+            return self.freeze_image
+
+        self.message = None
+        if action.kind == ALERT:
+            return self._alert(frame)
+        if action.kind == COUNTDOWN:
+            return self._put_count_down(frame, action.count)
+        if action.kind == PLAY:
+            topangle, bottomangle, pred, output_color = results
+
+            if action.move and cfg.PHYSICAL and self.arduino_link:
+                self._send(action.move)
+
+            frame = self._annotate_image(frame=frame, pred=pred, topangle=topangle, \
+                bottomangle=bottomangle, output_color=output_color)
+            self.freeze_image = frame
+
+        return frame
+
+
+class FreeStyleMode(ModeBase):
+    def __init__(self, arduino_link=None, render=True, clock=time.monotonic):
+        """
+        Runs inference and visualization streaming pipeline.
+        """
+        super().__init__(arduino_link=arduino_link, render=render, clock=clock)
+        self.freestyle = FreestyleState(cache_time=0. if cfg.CONSENSUS else cfg.CACHE_TIME)
+        self.consensus = Consensus(cfg.CONSENSUS_K, cfg.CONSENSUS_N, cfg.CONSENSUS_MIN_MARGIN) if cfg.CONSENSUS else None
+        self.classifier = mode_classifier(cfg.ANGLE_CUTOFF_FREESTYLE)
+        self.predictor = None
+        self.early_consensus = None
+        self.early_pred = None
+        if cfg.EARLY_PREDICTION:
+            # Extrapolates finger angles, so it always uses the angle rule
+            self.predictor = TrajectoryPredictor(AngleClassifier(angle_cutoff=cfg.ANGLE_CUTOFF_FREESTYLE),
+                                                 horizon=cfg.EARLY_PREDICTION_HORIZON,
+                                                 min_confidence=cfg.EARLY_PREDICTION_CONFIDENCE)
+            if cfg.CONSENSUS:  # early predictions have to agree just like the frame-by-frame ones
+                self.early_consensus = Consensus(cfg.CONSENSUS_K, cfg.CONSENSUS_N, cfg.CONSENSUS_MIN_MARGIN)
+
+        self.video_processor = VideoProcessor(
+            classifier=self.classifier, \
+            model_complexity=cfg.MODEL_COMPLEXITY, \
+            min_detection_confidence=cfg.MIN_DETECTION_CONFIDENCE_FREESTYLE, \
+            min_tracking_confidence=cfg.MIN_TRACKING_CONFIDENCE_FREESTYLE, \
+            paper_color_intensity=cfg.PAPER_COLOR_INTENSITY, \
+            scissor_color_intensity=cfg.SCISSOR_COLOR_INTENSITY, \
+            rock_color_intensity=cfg.ROCK_COLOR_INTENSITY, \
+            recorder=session_recorder('freestyle'), \
+            quality_controller=QualityController(cfg.QUALITY_LEVELS, cfg.LATENCY_BUDGET) if cfg.ADAPTIVE_QUALITY else None, \
+            draw=render, \
+            smoother=landmark_smoother()
+        )
+
+    def _early_prediction(self, now):
+        """Hand the visitor is heading for, or None; with CONSENSUS only once enough early predictions agree."""
+        early = self.predictor.update(now, self.video_processor.last_landmarks)
+        if self.early_consensus is None:
+            return early.pred if early is not None else None
+        if early is None:
+            return self.early_consensus.update(None, 0.)
+        angle_classifier = self.predictor.classifier
+        margin = angle_classifier.margin(*angle_classifier.calc_scores(early.top_angle, early.bottom_angle))
+        return self.early_consensus.update(early.pred, margin)
+
+    def _recv_image(self, frame):
+        self.message = None
+
+        now = self.clock()
+        results = self.video_processor.process(frame, timestamp=now)
+        pred = results[2] if results else None
+        if self.consensus is not None:
+            if results:
+                pred = self.consensus.update(pred, self.classifier.margin(*self.video_processor.last_scores))
+            else:
+                self.consensus.reset()
+        if self.predictor is not None:
+            if not results:
+                self.predictor.reset()
+                self.early_pred = None
+                if self.early_consensus is not None:
+                    self.early_consensus.reset()
+            elif self.video_processor.fresh_detection:  # reused landmarks at a new time would look like a still hand
+                self.early_pred = self._early_prediction(now)
+            if self.early_pred is not None:
+                pred = self.early_pred  # move on the hand the visitor is heading for
+        action = self.freestyle.step(now, pred)
+
+        if results:
+            topangle, bottomangle, pred, output_color = results
+
+            if action.move and cfg.PHYSICAL and self.arduino_link:
+                self._send(action.move)
+
+            frame = self._annotate_image(frame=frame, pred=pred, topangle=topangle, \
+                bottomangle=bottomangle, output_color=output_color)
+
+        return frame
@@ -0,0 +1,80 @@
+"""Searches the Hands settings and angle cutoff on a corpus of labelled recorded videos.
+
+Videos are labelled by their path, e.g. clips/scissors/001.mp4. Every candidate is run over every
+video in a process pool for its accuracy. Its latency is then timed again one candidate at a time,
+since the pool's workers compete for the CPU. The latency-vs-accuracy frontier is printed and the
+cheapest candidate that keeps the accuracy is written out as config lines.
+
+Examples:
+    python run_autotune.py clips/ --mode freestyle
+    python run_autotune.py clips/ --random 40 --workers 4 --output tuned_config.py
+"""
+
+import argparse
+import json
+
+import numpy as np
+
+from helpers.replay_helper import VIDEO_EXTENSIONS, find_inputs
+from helpers.tuning_helper import (autotune, choose, grid_candidates,
+                                   pareto_frontier, random_candidates)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('inputs', nargs='+', help='Labelled video files or directories containing them.')
+    parser.add_argument('--mode', choices=['game', 'freestyle'], default='game', help='Which config constants to write.')
+    parser.add_argument('--random', type=int, default=None, help='Evaluate this many random candidates instead of the grid.')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--tolerance', type=float, default=0.01, help='Accepted accuracy loss for a cheaper candidate.')
+    parser.add_argument('--workers', type=int, default=None, help='Processes in the pool (default: all cores).')
+    parser.add_argument('--max-frames', type=int, default=None, help='Stop each video after this many frames.')
+    parser.add_argument('--timing-frames', type=int, default=100,
+                        help='Frames per video to time every candidate on, one at a time (not needed with --workers 1).')
+    parser.add_argument('--output', default='tuned_config.py', help='Where to write the chosen config lines.')
+    parser.add_argument('--json', help='Also write all results to this JSON file.')
+    return parser.parse_args()
+
+
+def format_result(result):
+    return (f'complexity {result["model_complexity"]}  detection {result["min_detection_confidence"]:.2f}  '
+            f'tracking {result["min_tracking_confidence"]:.2f}  cutoff {result["angle_cutoff"]:5.1f}  '
+            f'accuracy {result["accuracy"]:6.1%}  detected {result["detection_rate"]:6.1%}  '
+            f'p50 {result["latency_p50_ms"]:6.2f} ms  p90 {result["latency_p90_ms"]:6.2f} ms')
+
+
+def main():
+    args = parse_args()
+    videos = [path for path in find_inputs(args.inputs) if path.lower().endswith(VIDEO_EXTENSIONS)]
+    candidates = random_candidates(args.random, args.seed) if args.random else grid_candidates()
+    print(f'Evaluating {len(candidates)} candidates on {len(videos)} videos')
+
+    results = autotune(videos, candidates, cutoffs=np.arange(60, 160.5, 0.5),
+                       workers=args.workers, max_frames=args.max_frames, timing_frames=args.timing_frames)
+    if not results:
+        print('Nothing to evaluate! Are the videos labelled with a rock/, paper/ or scissors/ folder?')
+        return
+
+    print('\nLatency vs accuracy frontier:')
+    for result in pareto_frontier(results):
+        print('  ' + format_result(result))
+
+    chosen = choose(results, tolerance=args.tolerance)
+    print('\nChosen:\n  ' + format_result(chosen))
+
+    suffix = args.mode.upper()
+    with open(args.output, 'w') as f:
+        f.write(f'"""Autotuned {args.mode} settings, copy into config.py."""\n\n')
+        f.write(f'MODEL_COMPLEXITY={chosen["model_complexity"]}\n')
+        f.write(f'MIN_DETECTION_CONFIDENCE_{suffix}={chosen["min_detection_confidence"]}\n')
+        f.write(f'MIN_TRACKING_CONFIDENCE_{suffix}={chosen["min_tracking_confidence"]}\n')
+        f.write(f'ANGLE_CUTOFF_{suffix}={chosen["angle_cutoff"]:g}\n')
+    print(f'Wrote {args.output}')
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'results': results, 'chosen': chosen}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,199 @@
+"""Microbenchmarks of the hot path: classification, overlays, VideoProcessor.process and the mode recv.
+
+Hands for the classifiers are synthetic. VideoProcessor and recv run on frames of the given video
+(or on empty frames when no video is given, which only exercises detection without a hand).
+The modes run on a clock advancing 1/VIDEO_FPS per frame, so their countdowns and plays fall on
+the same frames in every run.
+
+Examples:
+    python run_benchmark.py --output bench.json
+    python run_benchmark.py --video clips/rock/001.mp4 --baseline bench.json
+    python run_benchmark.py --only overlay
+"""
+
+import argparse
+import itertools
+import sys
+
+import numpy as np
+
+RESOLUTIONS = {
+    '480p': (480, 640),
+    '720p': (720, 1280),
+    '1080p': (1080, 1920),
+}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--video', help='Video to take the frames for process/recv from.')
+    parser.add_argument('--frames', type=int, default=100, help='Number of stored frames to cycle through.')
+    parser.add_argument('--min-time', type=float, default=1., help='Seconds to time every benchmark.')
+    parser.add_argument('--only', help='Only run benchmarks whose name contains this text.')
+    parser.add_argument('--output', help='Write the results to this JSON file.')
+    parser.add_argument('--baseline', help='Compare against the results in this JSON file.')
+    parser.add_argument('--threshold', type=float, default=0.1, help='Relative p50 slowdown that counts as a regression.')
+    return parser.parse_args()
+
+
+def load_frames(path, count, shape=(480, 640)):
+    import cv2
+
+    if path is None:
+        return [np.zeros(shape + (3,), dtype=np.uint8) for _ in range(count)]
+    capture = cv2.VideoCapture(path)
+    frames = []
+    while len(frames) < count:
+        grabbed, frame = capture.read()
+        if not grabbed:
+            break
+        frames.append(frame)
+    capture.release()
+    return frames
+
+
+def classifier_benchmarks():
+    from classification import AngleClassifier, DistanceClassifier
+    from helpers.classifier_ensemble import ClassifierEnsemble
+    from helpers.delta_gate import DeltaGate
+    from helpers.synthetic_hands import HandGenerator, to_protobuf
+    from helpers.tuning_helper import train_linear_classifier
+
+    hands, labels = HandGenerator(seed=0).generate(1000)
+    linear_classifier = train_linear_classifier(hands, labels, steps=100)
+    hands = [to_protobuf(hand).landmark for hand in hands]
+    ensemble = ClassifierEnsemble({'angle': AngleClassifier(angle_cutoff=100), 'distance': DistanceClassifier(),
+                                   'linear': linear_classifier})
+    for classifier in (AngleClassifier(angle_cutoff=100), DistanceClassifier(), linear_classifier, ensemble):
+        cycle = itertools.cycle(hands)
+        yield f'classify/{type(classifier).__name__}.predict', lambda c=classifier, h=cycle: c.predict(next(h))
+
+    # A hand holding its poses, with a little detector jitter
+    _, held, _ = HandGenerator(seed=0, noise=0.001).trajectory([0, 1, 2], hold=2.)
+    held = itertools.cycle([to_protobuf(hand).landmark for hand in held])
+    for classifier in (AngleClassifier(angle_cutoff=100), linear_classifier):
+        gate = DeltaGate(classifier)
+        yield f'classify/DeltaGate({type(classifier).__name__}).predict/hold', lambda g=gate: g.predict(next(held))
+
+
+def filter_benchmarks():
+    from helpers.landmark_filter import OneEuroFilter
+    from helpers.synthetic_hands import HandGenerator
+
+    hands = itertools.cycle(HandGenerator(seed=0).generate(1000)[0])
+    frame_times = itertools.count()
+    smoother = OneEuroFilter()
+    yield 'filter/OneEuroFilter', lambda: smoother(next(frame_times) / 30., next(hands))
+
+
+def overlay_benchmarks():
+    from helpers import gui_helper
+
+    for resolution, (height, width) in RESOLUTIONS.items():
+        frame = np.full((height, width, 3), 127, dtype=np.uint8)
+        overlays = {
+            'putDetection': lambda f=frame: gui_helper.putDetection(f, 'rock', (0, 0, 0)),
+            'putAlert': lambda f=frame: gui_helper.putAlert(f),
+            'putCountDown': lambda f=frame: gui_helper.putCountDown(f, 3),
+            'putTopAngle': lambda f=frame: gui_helper.putTopAngle(f, 123.4),
+            'putBottomAngle': lambda f=frame: gui_helper.putBottomAngle(f, 56.7),
+            'putClassLabels': lambda f=frame: gui_helper.putClassLabels(f),
+            'putIterationsPerSec': lambda f=frame: gui_helper.putIterationsPerSec(f, 30),
+        }
+        for name, fn in overlays.items():
+            yield f'overlay/{name}/{resolution}', fn
+
+
+class FrameClock(object):
+    """Clock of a stream at a fixed fps: advances 1/fps per frame, however long the frame took,
+    so the game phases fall on the same frames in every run."""
+
+    def __init__(self, fps):
+        self.fps = fps
+        self.frame = 0
+
+    def __call__(self):
+        return self.frame / self.fps
+
+    def tick(self):
+        self.frame += 1
+
+
+def pipeline_benchmarks(frames, wanted):
+    """The detector and the modes are only built for the benchmarks wanted(name) selects."""
+    import config as cfg
+
+    name = 'pipeline/VideoProcessor.process'
+    if wanted(name):
+        from classification import AngleClassifier
+        from helpers.video_helper import VideoProcessor
+
+        video_processor = VideoProcessor(
+            classifier=AngleClassifier(angle_cutoff=cfg.ANGLE_CUTOFF_GAME),
+            model_complexity=cfg.MODEL_COMPLEXITY,
+            min_detection_confidence=cfg.MIN_DETECTION_CONFIDENCE_GAME,
+            min_tracking_confidence=cfg.MIN_TRACKING_CONFIDENCE_GAME,
+        )
+        # process draws on the frame, so every call gets a fresh copy
+        cycle = itertools.cycle(frames)
+        frame_times = itertools.count()
+        yield name, lambda: video_processor.process(next(cycle).copy(), timestamp=next(frame_times) / cfg.VIDEO_FPS)
+
+    mode_names = [mode for mode in ('GameMode', 'FreeStyleMode') if wanted(f'recv/{mode}.recv')]
+    if not mode_names:
+        return
+    import av
+
+    import modes as mode_module
+
+    video_frames = [av.VideoFrame.from_ndarray(frame, format='bgr24') for frame in frames]
+    for mode in mode_names:
+        clock = FrameClock(cfg.VIDEO_FPS)
+        processor = getattr(mode_module, mode)(arduino_link=None, clock=clock)
+        processor.flight_recorder.latency_threshold = float('inf')  # no dumps of slow benchmark frames
+        cycle = itertools.cycle(video_frames)
+
+        def recv(processor=processor, clock=clock, cycle=cycle):
+            clock.tick()
+            return processor.recv(next(cycle))
+        yield f'recv/{mode}.recv', recv
+
+
+def main():
+    args = parse_args()
+    from helpers.benchmark_helper import bench, compare, save_results
+
+    frames = load_frames(args.video, args.frames)
+    if not frames:
+        print(f'Could not read any frames from {args.video}!')
+        return 1
+
+    def wanted(name):
+        return not args.only or args.only in name
+
+    benchmarks = itertools.chain(classifier_benchmarks(), filter_benchmarks(), overlay_benchmarks(),
+                                 pipeline_benchmarks(frames, wanted))
+    results = {}
+    for name, fn in benchmarks:
+        if not wanted(name):
+            continue
+        results[name] = bench(fn, min_time=args.min_time)
+        r = results[name]
+        print(f'{name:45} mean {r["mean_us"]:10.1f} us  p50 {r["p50_us"]:10.1f} us  p99 {r["p99_us"]:10.1f} us  '
+              f'alloc {r["alloc_peak_bytes"] / 1024:9.1f} KiB  ({r["calls"]} calls)')
+
+    if args.output:
+        save_results(args.output, results)
+        print(f'Wrote {args.output}')
+
+    if args.baseline:
+        print(f'\nCompared to {args.baseline}:')
+        regressions = compare(results, args.baseline, threshold=args.threshold)
+        if regressions:
+            print(f'{len(regressions)} benchmark(s) regressed more than {args.threshold:.0%}')
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
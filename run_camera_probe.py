@@ -0,0 +1,111 @@
+"""Measures what the attached camera really delivers with every capture profile in config.py.
+
+For every profile the negotiated format, resolution, frame rate and buffer size are printed with:
+* the delivered fps while reading as fast as possible,
+* the frame age: time from the driver timestamp of a frame until read returns it (V4L2 only),
+* the queued frames: frames returned immediately after a pause, i.e. the stale frames the
+  driver buffers whenever the consumer falls behind.
+
+Examples:
+    python run_camera_probe.py
+    python run_camera_probe.py --camera 2 --profiles default low_latency --duration 10
+    python run_camera_probe.py --list
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--camera', type=int, default=0, help='Camera index.')
+    parser.add_argument('--list', action='store_true', help='Only list the connected cameras and their USB identities.')
+    parser.add_argument('--profiles', nargs='+', help='Profiles to probe; all of CAPTURE_PROFILES by default.')
+    parser.add_argument('--duration', type=float, default=5., help='Seconds to read frames per profile.')
+    parser.add_argument('--warmup', type=int, default=30, help='Frames to skip while exposure and white balance settle.')
+    return parser.parse_args()
+
+
+def measure_fps_and_age(stream, duration):
+    import cv2
+
+    count, ages = 0, []
+    start = time.perf_counter()
+    while time.perf_counter() - start < duration:
+        if not stream.read()[0]:
+            break
+        count += 1
+        # V4L2 reports the driver timestamp of the buffer on the monotonic clock
+        age = time.monotonic() * 1000 - stream.get(cv2.CAP_PROP_POS_MSEC)
+        if 0 < age < 1000:
+            ages.append(age)
+    return count / (time.perf_counter() - start), ages
+
+
+def measure_queued(stream, fps, pauses=5, pause=0.5):
+    """Median number of frames that are returned at once after the consumer paused."""
+    queued = []
+    for _ in range(pauses):
+        time.sleep(pause)
+        n = 0
+        while n < 64:
+            start = time.perf_counter()
+            if not stream.grab() or time.perf_counter() - start > 0.5 / fps:
+                break
+            n += 1
+        queued.append(n)
+    return int(np.median(queued))
+
+
+def probe(src, profile, duration, warmup):
+    from helpers.video_helper import capture_settings, open_capture
+
+    stream = open_capture(src, profile)
+    if not stream.isOpened():
+        return None
+    try:
+        for _ in range(warmup):
+            stream.read()
+        result = capture_settings(stream)
+        result['delivered_fps'], ages = measure_fps_and_age(stream, duration)
+        result['age_p50_ms'] = float(np.percentile(ages, 50)) if ages else None
+        result['age_p90_ms'] = float(np.percentile(ages, 90)) if ages else None
+        result['queued'] = measure_queued(stream, max(result['delivered_fps'], 1.))
+    finally:
+        stream.release()
+    return result
+
+
+def fmt(value, width, spec=''):
+    """Formats a value that can be missing (None) in a column of the given width."""
+    return format(value, f'{width}{spec}') if value is not None else '-'.rjust(width)
+
+
+def main():
+    args = parse_args()
+    import config as cfg
+
+    if args.list:
+        from helpers.camera_helper import discover_cameras
+
+        for camera in discover_cameras(cache_path=cfg.CAMERA_CACHE, refresh=True):
+            print(f'{camera.index:3d} {camera.path or "-":14} {camera.usb_id or "-":24} {camera.usb_port or "-":10} {camera.name or ""}')
+        return
+
+    names = args.profiles or list(cfg.CAPTURE_PROFILES)
+    print(f'{"profile":18} {"backend":9} {"format":6} {"size":>9} {"fps set":>7} {"fps got":>7} {"buffer":>6} '
+          f'{"age p50":>7} {"age p90":>7} {"queued":>6}')
+    for name in names:
+        r = probe(args.camera, cfg.CAPTURE_PROFILES[name], args.duration, args.warmup)
+        if r is None:
+            print(f'{name:18} could not open camera {args.camera}')
+            continue
+        print(f'{name:18} {fmt(r["backend"], 9)} {fmt(r["fourcc"], 6)} {r["width"]:>4d}x{r["height"]:<4d} '
+              f'{r["fps"]:7.1f} {r["delivered_fps"]:7.1f} {r["buffer_size"]:6d} {fmt(r["age_p50_ms"], 7, ".1f")} '
+              f'{fmt(r["age_p90_ms"], 7, ".1f")} {r["queued"]:6d}')
+
+
+if __name__ == '__main__':
+    main()
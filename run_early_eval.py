@@ -0,0 +1,81 @@
+"""Measures how early and how reliably the trajectory predictor announces moves.
+
+Runs TrajectoryPredictor over recorded landmark sessions (see RECORD_SESSIONS in config.py)
+or synthetic hands moving between poses, for every horizon and confidence given. A move is
+anticipated when the predictor named the new hand before the frame-by-frame classifier showed
+it; the lead is the time gained. Precision is the share of speculative predictions that match
+the next settled hand.
+
+Examples:
+    python run_early_eval.py recordings/
+    python run_early_eval.py --synthetic 500 --horizons 0.1 0.15 0.2 --confidences 0.8 0.9 0.95
+"""
+
+import argparse
+
+import numpy as np
+
+
+def parse_args():
+    import config as cfg
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('inputs', nargs='*', help='Recorded sessions or directories with sessions.')
+    parser.add_argument('--synthetic', type=int, default=0, help='Also evaluate this many synthetic moves.')
+    parser.add_argument('--horizons', type=float, nargs='+', default=[cfg.EARLY_PREDICTION_HORIZON])
+    parser.add_argument('--confidences', type=float, nargs='+', default=[cfg.EARLY_PREDICTION_CONFIDENCE])
+    parser.add_argument('--angle-cutoff', type=float, default=cfg.ANGLE_CUTOFF_FREESTYLE)
+    parser.add_argument('--settle', type=int, default=3, help='Frames a hand must hold to count as settled.')
+    return parser.parse_args()
+
+
+def load_sequences(args):
+    """(times, landmarks) of every recorded session, plus the synthetic sequence."""
+    sequences = []
+    if args.inputs:
+        from helpers.replay_helper import VIDEO_EXTENSIONS, find_inputs
+        from helpers.session_recorder import load_session
+
+        for path in find_inputs(args.inputs):
+            if not path.lower().endswith(VIDEO_EXTENSIONS):
+                session = load_session(path)
+                sequences.append((session['time'], session['landmarks']))
+    if args.synthetic:
+        from helpers.synthetic_hands import HandGenerator
+
+        generator = HandGenerator(seed=0, noise=0.002)
+        labels = [0]
+        while len(labels) <= args.synthetic:
+            labels.append((labels[-1] + generator.rng.integers(1, 3)) % 3)  # always a different hand
+        times, landmarks, _ = generator.trajectory(labels)
+        sequences.append((times, landmarks))
+    return sequences
+
+
+def main():
+    args = parse_args()
+    from classification import AngleClassifier
+    from helpers.trajectory_predictor import TrajectoryPredictor, evaluate_early
+
+    sequences = load_sequences(args)
+    if not sequences:
+        print('Nothing to evaluate, give recordings or --synthetic N')
+        return
+
+    classifier = AngleClassifier(angle_cutoff=args.angle_cutoff)
+    print(f'{"horizon":>7} {"confidence":>10} {"moves":>6} {"anticipated":>11} {"lead p50 ms":>11} {"precision":>9}')
+    for horizon in args.horizons:
+        for confidence in args.confidences:
+            predictor = TrajectoryPredictor(classifier, horizon=horizon, min_confidence=confidence)
+            totals = {'moves': 0, 'anticipated': 0, 'leads': [], 'speculative': 0, 'correct': 0}
+            for times, landmarks in sequences:
+                for key, value in evaluate_early(times, landmarks, predictor, settle=args.settle).items():
+                    totals[key] += value
+            lead = f'{np.median(totals["leads"]) * 1000:11.0f}' if totals['leads'] else f'{"-":>11}'
+            precision = totals['correct'] / totals['speculative'] if totals['speculative'] else float('nan')
+            print(f'{horizon:7.2f} {confidence:10.2f} {totals["moves"]:6d} '
+                  f'{totals["anticipated"] / max(totals["moves"], 1):11.1%} {lead} {precision:9.1%}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+"""Simulates game mode against random visitors, faster than real time, to check timing settings.
+
+Every visitor shows a hand some reaction time after the countdown ends (too early when
+negative) and holds it a while. Reports plays and too-fast alerts per minute and how long
+after the countdown the robot plays, for the settings in config.py or the ones given here.
+
+Examples:
+    python run_game_sim.py
+    python run_game_sim.py --delay 2 --count-from 4 --too-fast-delay 0.5 --reaction 0.2 0.3
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+
+def parse_args():
+    import config as cfg
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--delay', type=float, default=cfg.DELAY)
+    parser.add_argument('--count-from', type=int, default=cfg.COUNT_FROM)
+    parser.add_argument('--too-fast-delay', type=float, default=cfg.TOO_FAST_DELAY)
+    parser.add_argument('--fps', type=float, default=30.)
+    parser.add_argument('--minutes', type=float, default=600., help='Simulated minutes of play.')
+    parser.add_argument('--reaction', type=float, nargs=2, default=(0.3, 0.2), metavar=('MEAN', 'STD'),
+                        help='Seconds after the countdown the visitor shows a hand.')
+    parser.add_argument('--hold', type=float, nargs=2, default=(0.8, 0.3), metavar=('MEAN', 'STD'),
+                        help='Seconds the visitor holds the hand.')
+    parser.add_argument('--seed', type=int, default=0)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    from helpers.game_state import GameState, simulate_games
+
+    state = GameState(start=0., count_from=args.count_from, delay=args.delay, too_fast_delay=args.too_fast_delay)
+    start = time.perf_counter()
+    result = simulate_games(state, np.random.default_rng(args.seed), args.minutes * 60, fps=args.fps,
+                            reaction=args.reaction, hold=args.hold)
+    wall = time.perf_counter() - start
+
+    delays = np.array(result['delays'])
+    print(f'COUNT_FROM={args.count_from} DELAY={args.delay:g} TOO_FAST_DELAY={args.too_fast_delay:g}, '
+          f'{args.minutes:g} simulated minutes in {wall:.2f} s ({args.minutes * 60 / wall:,.0f}x real time)')
+    print(f'plays per minute:  {result["plays"] / args.minutes:6.2f}')
+    print(f'alerts per minute: {result["alerts"] / args.minutes:6.2f} '
+          f'({result["alerts"] / max(result["plays"] + result["alerts"], 1):.1%} of the attempts)')
+    if len(delays):
+        print(f'play after countdown: p50 {np.percentile(delays, 50):.2f} s, p90 {np.percentile(delays, 90):.2f} s')
+
+
+if __name__ == '__main__':
+    main()
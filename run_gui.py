@@ -1,27 +1,46 @@
 import logging
+import queue
 from re import A
 import threading
-import time
 import webbrowser
 
-import av
 import streamlit as st
-from streamlit_webrtc import (RTCConfiguration, VideoProcessorBase, WebRtcMode,
-                              webrtc_streamer)
+from streamlit_webrtc import RTCConfiguration, WebRtcMode, webrtc_streamer
 
 import config as cfg
-from classification import AngleClassifier, DistanceClassifier
 from connection import Connection
+from helpers import startup_helper
 from helpers.arduino_io import ArduinoLink
-from helpers.gui_helper import (putBottomAngle, putClassLabels, putCountDown,
-                                putDetection, putTopAngle, putAlert)
-from helpers.video_helper import VideoProcessor
+from helpers.classifier_ensemble import missing_model, settings_from_config
+from helpers.hardware_service import HardwareClient
+from helpers.trace_helper import TRACER
 
 logger = logging.getLogger(__name__)
 
 RTC_CONFIGURATION = RTCConfiguration({"iceServers": []})
 
-if cfg.PHYSICAL and not Connection.connection:
+MEDIA_STREAM_CONSTRAINTS = {
+    "video": {
+        "width": {"ideal": cfg.VIDEO_WIDTH},
+        "height": {"ideal": cfg.VIDEO_HEIGHT},
+        "frameRate": {"ideal": cfg.VIDEO_FPS, "max": cfg.VIDEO_FPS},
+    },
+    "audio": False,
+}
+
+
+@st.experimental_singleton
+def hardware_client():
+    """
+    One client of the hardware service per server process, shared by every session,
+    so reruns keep using its connection instead of opening a new one.
+    """
+    return HardwareClient(cfg.HARDWARE_SOCKET)
+
+
+if cfg.PHYSICAL and cfg.HARDWARE_SERVICE:
+    ARDUINO_LINK = hardware_client()
+elif cfg.PHYSICAL and not Connection.connection:
     Connection.connection = True
     ARDUINO_LINK = ArduinoLink()
     ARDUINO_LINK.test_ports()
@@ -29,25 +48,71 @@ if cfg.PHYSICAL and not Connection.connection:
 else:
     ARDUINO_LINK = Connection.link
 
+TRACER.enabled = cfg.TRACING
+
+
+@st.experimental_singleton
+def start_warm_up():
+    """
+    Warms up the detectors, classification and overlays once per server process,
+    in the background so the page shows right away.
+    """
+    thread = threading.Thread(target=startup_helper.warm_up, name="warm-up", daemon=True)
+    thread.start()
+    return thread
+
+
+def mode_factory(name, **kwargs):
+    """
+    Returns a factory of the named mode. modes (and with it mediapipe) is only
+    imported when a session starts; by then the warm-up has loaded it.
+    """
+    def factory():
+        import modes
+        return getattr(modes, name)(arduino_link=ARDUINO_LINK, **kwargs)
+    return factory
+
+
 def main():
+    start_warm_up()
     st.header("✋ ✌️ ✊ 🤖")
 
+    problem = missing_model(settings_from_config(cfg))
+    if problem:
+        st.error(problem)
+        st.stop()
+
     freestyle_mode_page = "Freestyle Mode"
     game_mode_page = "Game mode"
+    game_overlay_page = "Game mode (browser overlays)"
+    freestyle_overlay_page = "Freestyle Mode (browser overlays)"
 
     app_mode = st.sidebar.selectbox(
         "Mode:",
         [
             game_mode_page,
-            freestyle_mode_page
+            freestyle_mode_page,
+            game_overlay_page,
+            freestyle_overlay_page
         ],
     )
     st.subheader(app_mode)
 
+    if cfg.PHYSICAL and cfg.HARDWARE_SERVICE:
+        st.sidebar.write(f"Robot: {ARDUINO_LINK.state()['state']}")
+
+    if cfg.TRACING and st.sidebar.button("Export latency trace"):
+        TRACER.export_chrome_trace(cfg.TRACE_OUTPUT)
+        st.sidebar.write(f"Wrote trace to {cfg.TRACE_OUTPUT}")
+
     if app_mode == game_mode_page:
         app_game_mode()
     elif app_mode == freestyle_mode_page:
         app_freestyle_mode()
+    elif app_mode == game_overlay_page:
+        app_overlay_mode("GameMode")
+    elif app_mode == freestyle_overlay_page:
+        app_overlay_mode("FreeStyleMode")
 
     logger.debug("=== Alive threads ===")
     for thread in threading.enumerate():
@@ -61,179 +126,87 @@ def app_loopback():
 
 
 def app_game_mode():
-    """RPS freestyle mode page"""
-    class GameMode(VideoProcessorBase):
-        def __init__(self):
-            """
-            Runs inference and visualization streaming pipeline.
-            """
-            self.count = time.time()
-            self.last_freeze = 0
-            self.last_too_fast = 0
-            self.freeze_frame = None
-            self.classifier = AngleClassifier(angle_cutoff=cfg.ANGLE_CUTOFF_GAME)  # seems to be the best classifier
-
-            self.video_processor = VideoProcessor(
-                classifier=self.classifier, \
-                model_complexity=cfg.MODEL_COMPLEXITY, \
-                min_detection_confidence=cfg.MIN_DETECTION_CONFIDENCE_GAME, \
-                min_tracking_confidence=cfg.MIN_TRACKING_CONFIDENCE_GAME, \
-                paper_color_intensity=cfg.PAPER_COLOR_INTENSITY, \
-                scissor_color_intensity=cfg.SCISSOR_COLOR_INTENSITY, \
-                rock_color_intensity=cfg.ROCK_COLOR_INTENSITY
-            )
-
-        def _do_physical(self, pred):
-            if pred == 'rock':
-                ARDUINO_LINK.write(b'P')
-            elif pred == 'scissors':
-                ARDUINO_LINK.write(b'R')
-            elif pred == 'paper':
-                ARDUINO_LINK.write(b'S')
-
-        def _annotate_image(self, frame, pred, topangle, bottomangle, output_color):
-            if cfg.DISPLAY_ANGLES:
-                frame = putTopAngle(frame, topangle)
-                frame = putBottomAngle(frame, bottomangle)
-            if cfg.DISPLAY_CLASS_LABELS:
-                frame = putClassLabels(frame)
-            if cfg.VERBOSE:
-                logging.info(pred)
-            if cfg.DISPLAY_DETECTION:
-                frame = putDetection(frame, pred, output_color)
-
-            return frame
-
-        def _countdown(self):
-            time_diff = abs(time.time() - self.count)
-            if time_diff < (cfg.COUNT_FROM-1):
-                return True, ((cfg.COUNT_FROM) - round(time_diff))
-            else:
-                return False, None
-
-        def recv(self, frame: av.VideoFrame) -> av.VideoFrame:
-            if time.time() - self.last_freeze > cfg.DELAY:  # is last detection long enough ago to stop freeze frame & start new game?
-
-                frame = frame.to_ndarray(format="bgr24")
-
-                if time.time() - self.last_too_fast < cfg.TOO_FAST_DELAY:  # is last too fast detection long enough ago to start new game?
-                    frame = putAlert(frame)
-                    return av.VideoFrame.from_ndarray(frame, format="bgr24")
-
-                results = self.video_processor.process(frame)  # detect hands
-                is_countdown, time_diff = self._countdown()
-
-                if is_countdown:
-                    if results:  # detected hands during countdown (too fast)
-                        frame = putAlert(frame)
-                        self.count = time.time() + cfg.TOO_FAST_DELAY  # restart countdown
-                        self.last_too_fast = time.time()
-                        return av.VideoFrame.from_ndarray(frame, format="bgr24")
-                    else:
-                        frame = putCountDown(frame, time_diff)
-                else:
-                    if results:  # found results after countown
-                        topangle, bottomangle, pred, output_color = results
-
-                        if cfg.PHYSICAL:
-                            self._do_physical(pred=pred)
-
-                        frame = self._annotate_image(frame=frame, pred=pred, topangle=topangle, \
-                            bottomangle=bottomangle, output_color=output_color)
-
-                        self.count = time.time() + cfg.DELAY
-                        self.last_freeze = time.time()
-                        self.freeze_frame = av.VideoFrame.from_ndarray(frame, format="bgr24")
-
-                return av.VideoFrame.from_ndarray(frame, format="bgr24")
-            else: # still in delay period
-                return self.freeze_frame
-
+    """RPS game mode page"""
     _ = webrtc_streamer(
         key="object-detection",
         mode=WebRtcMode.SENDRECV,
         rtc_configuration=RTC_CONFIGURATION,
-        video_processor_factory=GameMode,
-        media_stream_constraints={"video": True, "audio": False},
+        video_processor_factory=mode_factory("GameMode"),
+        media_stream_constraints=MEDIA_STREAM_CONSTRAINTS,
         async_processing=True,
     )
 
 
-class Cache():
-    def __init__(self, now, result):
-        self.time = now
-        self.result = result
-
-    def update(self, now, result):
-        self.time = now
-        self.result = result
-
-
 def app_freestyle_mode():
     """RPS freestyle mode page"""
-    class FreeStyleMode(VideoProcessorBase):
-        def __init__(self):
-            """
-            Runs inference and visualization streaming pipeline.
-            """
-            self.cache = Cache(now=1, result='')
-            self.classifier = AngleClassifier(angle_cutoff=cfg.ANGLE_CUTOFF_FREESTYLE)  # seems to be the best classifier
-
-            self.video_processor = VideoProcessor(
-                classifier=self.classifier, \
-                model_complexity=cfg.MODEL_COMPLEXITY, \
-                min_detection_confidence=cfg.MIN_DETECTION_CONFIDENCE_FREESTYLE, \
-                min_tracking_confidence=cfg.MIN_TRACKING_CONFIDENCE_FREESTYLE, \
-                paper_color_intensity=cfg.PAPER_COLOR_INTENSITY, \
-                scissor_color_intensity=cfg.SCISSOR_COLOR_INTENSITY, \
-                rock_color_intensity=cfg.ROCK_COLOR_INTENSITY
-            )
-
-        def _annotate_image(self, frame, pred, topangle, bottomangle, output_color):
-            if cfg.DISPLAY_ANGLES:
-                frame = putTopAngle(frame, topangle)
-                frame = putBottomAngle(frame, bottomangle)
-            if cfg.DISPLAY_CLASS_LABELS:
-                frame = putClassLabels(frame)
-            if cfg.VERBOSE:
-                logging.info(pred)
-            if cfg.DISPLAY_DETECTION:
-                frame = putDetection(frame, pred, output_color)
-
-            return frame
+    _ = webrtc_streamer(
+        key="object-detection",
+        mode=WebRtcMode.SENDRECV,
+        rtc_configuration=RTC_CONFIGURATION,
+        video_processor_factory=mode_factory("FreeStyleMode"),
+        media_stream_constraints=MEDIA_STREAM_CONSTRAINTS,
+        async_processing=True,
+    )
 
-        def recv(self, frame: av.VideoFrame) -> av.VideoFrame:
-            frame = frame.to_ndarray(format="bgr24")
+def app_overlay_mode(mode):
+    """
+    RPS page where the server only receives video. The annotations are sent
+    to the browser as compact messages and drawn there, so no video is encoded.
+
+    Caveats: the frame loop runs blocking in the Streamlit script thread (a
+    rerun interrupts it) and sends every changed message with st.markdown,
+    i.e. up to once per frame over the Streamlit websocket. The overlay is
+    lined up with the video by the element gap of the pinned Streamlit version
+    (see renderOverlayHtml), so check it when upgrading Streamlit.
+    """
+    overlay_placeholder = st.empty()  # above the video, so the overlay can be positioned over it
+    webrtc_ctx = webrtc_streamer(
+        key="overlay",
+        mode=WebRtcMode.SENDONLY,
+        rtc_configuration=RTC_CONFIGURATION,
+        media_stream_constraints=MEDIA_STREAM_CONSTRAINTS,
+    )
+    if not (webrtc_ctx.state.playing and webrtc_ctx.video_receiver):
+        close_overlay_processor(mode)
+        return
+
+    from helpers.gui_helper import renderOverlayHtml
+
+    processor = overlay_processor(mode)
+    last_message = None
+
+    while webrtc_ctx.state.playing and webrtc_ctx.video_receiver:
+        try:
+            frame = webrtc_ctx.video_receiver.get_frame(timeout=1)
+        except queue.Empty:
+            continue
+        processor.recv(frame)
+        if processor.message != last_message:  # only send changes to the browser
+            overlay_placeholder.markdown(
+                renderOverlayHtml(processor.message, width=frame.width, height=frame.height),
+                unsafe_allow_html=True
+            )
+            last_message = processor.message
 
-            results = self.video_processor.process(frame)
+    close_overlay_processor(mode)
 
-            if results:
-                topangle, bottomangle, pred, output_color = results
 
-                if cfg.PHYSICAL:
-                    time_since_cache = abs(time.time() - self.cache.time)
-                    if (time_since_cache > cfg.CACHE_TIME) and (pred != self.cache.result): # only send instruction after cache time & if different than cached instruction
-                        if ARDUINO_LINK and pred == 'rock':
-                            ARDUINO_LINK.write(b'P')
-                        elif ARDUINO_LINK and pred == 'paper':
-                            ARDUINO_LINK.write(b'S')
-                        elif ARDUINO_LINK and pred == 'scissors':
-                            ARDUINO_LINK.write(b'R')
-                        self.cache.update(now=time.time(), result=pred)
+def overlay_processor(mode):
+    """
+    The mode processor of this session's overlay page. Reruns interrupt the
+    frame loop, so it is kept in the session state to build its detector once.
+    """
+    key = f"overlay_processor_{mode}"
+    if key not in st.session_state:
+        st.session_state[key] = mode_factory(mode, render=False)()
+    return st.session_state[key]
 
-                frame = self._annotate_image(frame=frame, pred=pred, topangle=topangle, \
-                    bottomangle=bottomangle, output_color=output_color)
 
-            return av.VideoFrame.from_ndarray(frame, format="bgr24")
+def close_overlay_processor(mode):
+    processor = st.session_state.pop(f"overlay_processor_{mode}", None)
+    if processor is not None:
+        processor.close()
 
-    _ = webrtc_streamer(
-        key="object-detection",
-        mode=WebRtcMode.SENDRECV,
-        rtc_configuration=RTC_CONFIGURATION,
-        video_processor_factory=FreeStyleMode,
-        media_stream_constraints={"video": True, "audio": False},
-        async_processing=True,
-    )
 
 if __name__ == "__main__":
     import os
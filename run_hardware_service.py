@@ -0,0 +1,52 @@
+"""Runs the hardware service: owns the Arduino link and takes moves from the web app and kiosk over a Unix socket.
+
+Start it once next to the web app and set HARDWARE_SERVICE=True in config.py. The web app
+then never opens the serial port, so Streamlit reruns can't touch the hardware.
+
+Examples:
+    python run_hardware_service.py
+    python run_hardware_service.py --port /dev/ttyACM0 --socket /tmp/rps.sock
+    python run_hardware_service.py --arduino pty
+"""
+
+import argparse
+import logging
+
+
+def parse_args():
+    import config as cfg
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--socket', default=cfg.HARDWARE_SOCKET, help='Unix socket to listen on.')
+    parser.add_argument('--port', default='/dev/ttyUSB0', help='Serial port of the Arduino.')
+    parser.add_argument('--min-interval', type=float, default=cfg.HARDWARE_MIN_INTERVAL,
+                        help='Drop moves that arrive sooner than this many seconds after the previous one.')
+    parser.add_argument('--arduino', choices=['serial', 'pty'], default='serial',
+                        help='Use the Arduino on the serial port, or a pseudo-terminal emulating the firmware.')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    from helpers.arduino_io import ArduinoLink, PtyArduino
+    from helpers.hardware_service import HardwareService
+
+    port = args.port
+    if args.arduino == 'pty':
+        port = PtyArduino().start().port
+    link = ArduinoLink()
+    link.test_ports(port=port)
+
+    service = HardwareService(link, args.socket, min_interval=args.min_interval).start()
+    try:
+        service.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.stop()
+        logging.info('Stopped after %d moves (%d dropped)', service.moves, service.dropped)
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -0,0 +1,92 @@
+"""Kiosk runtime: plays game or freestyle mode straight from the local camera, without a browser.
+
+Frames are captured by VideoGetter, run through the same GameMode/FreeStyleMode as the web app
+and shown full screen by VideoShower, so the WebRTC round trip and re-encoding drop out of the
+glass-to-servo latency. The Arduino is driven directly when PHYSICAL is set in config.py.
+Press q to quit.
+
+Examples:
+    python run_kiosk.py --mode game
+    python run_kiosk.py --mode freestyle --camera 2 --windowed --show-fps
+"""
+
+import argparse
+import logging
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--mode', choices=['game', 'freestyle'], default='game')
+    parser.add_argument('--camera', type=int, help='Camera index; CAMERA_ID from config.py by default.')
+    parser.add_argument('--profile', help='Capture profile from CAPTURE_PROFILES in config.py; CAPTURE_PROFILE by default.')
+    parser.add_argument('--windowed', action='store_true', help='Show a window instead of full screen.')
+    parser.add_argument('--show-fps', action='store_true', help='Draw the processed frames per second.')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    import config as cfg
+    from helpers.arduino_io import ArduinoLink
+    from helpers.gui_helper import putIterationsPerSec
+    from helpers.hardware_service import HardwareClient
+    from helpers.trace_helper import TRACER
+    from helpers.camera_helper import find_camera
+    from helpers.classifier_ensemble import missing_model, settings_from_config
+    from helpers.video_helper import CountsPerSec, VideoGetter, VideoShower
+    from modes import FreeStyleMode, GameMode
+
+    TRACER.enabled = cfg.TRACING
+
+    problem = missing_model(settings_from_config(cfg))
+    if problem:
+        logging.error(problem)
+        return
+
+    src = args.camera
+    if src is None:
+        src = find_camera(cfg.CAMERA_ID, cache_path=cfg.CAMERA_CACHE)
+        if src is None:
+            logging.error('Could not find camera %s!', cfg.CAMERA_ID or '')
+            return
+
+    arduino_link = None
+    if cfg.PHYSICAL and cfg.HARDWARE_SERVICE:
+        arduino_link = HardwareClient(cfg.HARDWARE_SOCKET)
+    elif cfg.PHYSICAL:
+        arduino_link = ArduinoLink()
+        arduino_link.test_ports()
+
+    mode = GameMode if args.mode == 'game' else FreeStyleMode
+    processor = mode(arduino_link=arduino_link)
+    getter = VideoGetter(src, profile=cfg.CAPTURE_PROFILES[args.profile or cfg.CAPTURE_PROFILE]).start()
+    shower = VideoShower(fullscreen=not args.windowed)
+    counter = CountsPerSec().start()
+
+    seq = 0
+    try:
+        while not (getter.stopped or shower.stopped):
+            newest = getter.wait_for_newer(seq, timeout=1.)
+            if newest is None:
+                continue
+            seq, _, frame = newest
+
+            # The slot is reused by the capture thread, and the modes draw on (and may keep) the frame
+            frame = processor.recv_image(frame.copy())
+            if args.show_fps:
+                frame = putIterationsPerSec(frame.copy(), counter.countsPerSec())
+            counter.increment()
+            shower.frame = frame
+            shower.show()
+    finally:
+        getter.stop()
+        processor.close()
+        logging.info('Skipped %d stale camera frames', getter.dropped)
+        if cfg.TRACING:
+            TRACER.export_chrome_trace(cfg.TRACE_OUTPUT)
+            logging.info('Wrote latency trace to %s', cfg.TRACE_OUTPUT)
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    main()
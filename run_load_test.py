@@ -0,0 +1,154 @@
+"""Load test of N concurrent game/freestyle sessions without a browser.
+
+Every session gets its own processor instance and worker thread, like streamlit-webrtc's
+async processing. Frames of a recorded video are offered at the target fps. A session that is
+still busy when the next frame is due skips it, just like a live stream drops frames.
+
+Examples:
+    python run_load_test.py clips/rock/001.mp4 --sessions 1 2 4 8
+    python run_load_test.py clips/rock/001.mp4 --mode game --arduino pty --duration 30
+"""
+
+import argparse
+import resource
+import threading
+import time
+
+import numpy as np
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('video', help='Recorded video to feed every session.')
+    parser.add_argument('--mode', choices=['game', 'freestyle'], default='freestyle')
+    parser.add_argument('--sessions', type=int, nargs='+', default=[1, 2, 4, 8], help='Numbers of concurrent sessions to test.')
+    parser.add_argument('--fps', type=float, default=30., help='Frame rate offered to every session.')
+    parser.add_argument('--duration', type=float, default=20., help='Seconds to run every step.')
+    parser.add_argument('--frames', type=int, default=300, help='Number of video frames to loop over.')
+    parser.add_argument('--arduino', choices=['none', 'mock', 'pty'], default='mock',
+                        help='Attach an in-memory mock or a pseudo-terminal emulating the firmware.')
+    return parser.parse_args()
+
+
+def load_video_frames(path, count):
+    import av
+    import cv2
+
+    capture = cv2.VideoCapture(path)
+    frames = []
+    while len(frames) < count:
+        grabbed, frame = capture.read()
+        if not grabbed:
+            break
+        video_frame = av.VideoFrame.from_ndarray(frame, format='bgr24')
+        video_frame.pts = len(frames)
+        frames.append(video_frame)
+    capture.release()
+    return frames
+
+
+def rss_mb():
+    """Current resident set size, from /proc when available, else the peak."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * resource.getpagesize() / 2 ** 20
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def cpu_seconds():
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+
+def run_session(processor, frames, fps, deadline, stats):
+    """Offers a frame every 1/fps seconds and calls recv on the latest one when free."""
+    interval = 1. / fps
+    start = time.perf_counter()
+    processed = 0
+    while True:
+        now = time.perf_counter()
+        if now >= deadline:
+            break
+        due = int((now - start) / interval)
+        if due < processed:
+            time.sleep((processed * interval + start) - now)
+            continue
+        stats['dropped'] += due - processed
+        start_recv = time.perf_counter()
+        processor.recv(frames[due % len(frames)])
+        stats['latencies'].append(time.perf_counter() - start_recv)
+        processed = due + 1
+
+
+def run_step(mode, n, frames, args, arduino_link):
+    processors = [mode(arduino_link=arduino_link) for _ in range(n)]
+    stats = [{'latencies': [], 'dropped': 0} for _ in range(n)]
+    for processor in processors:
+        processor.recv(frames[0])  # load the graph before timing
+
+    cpu_start, wall_start = cpu_seconds(), time.perf_counter()
+    deadline = wall_start + args.duration
+    threads = [threading.Thread(target=run_session, args=(processor, frames, args.fps, deadline, stat))
+               for processor, stat in zip(processors, stats)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall, cpu = time.perf_counter() - wall_start, cpu_seconds() - cpu_start
+    rss = rss_mb()
+
+    for processor in processors:
+        processor.close()
+
+    latencies = np.concatenate([stat['latencies'] for stat in stats]) * 1000
+    processed = len(latencies)
+    dropped = sum(stat['dropped'] for stat in stats)
+    return {
+        'sessions': n,
+        'fps_per_session': processed / wall / n,
+        'throughput': processed / wall,
+        'dropped': dropped / max(processed + dropped, 1),
+        'p50_ms': float(np.percentile(latencies, 50)),
+        'p90_ms': float(np.percentile(latencies, 90)),
+        'p99_ms': float(np.percentile(latencies, 99)),
+        'cpu_cores': cpu / wall,
+        'rss_mb': rss,
+    }
+
+
+def main():
+    args = parse_args()
+    from helpers.arduino_io import ArduinoLink, MockArduinoLink, PtyArduino
+    from modes import FreeStyleMode, GameMode
+
+    frames = load_video_frames(args.video, args.frames)
+    if not frames:
+        print(f'Could not read any frames from {args.video}!')
+        return
+
+    fake_arduino = None
+    if args.arduino == 'mock':
+        arduino_link = MockArduinoLink()
+    elif args.arduino == 'pty':
+        fake_arduino = PtyArduino().start()
+        arduino_link = ArduinoLink()
+        arduino_link.test_ports(port=fake_arduino.port)
+    else:
+        arduino_link = None
+
+    mode = GameMode if args.mode == 'game' else FreeStyleMode
+    print(f'{args.mode} mode, {len(frames)} frames offered at {args.fps:g} fps per session, {args.duration:g} s per step')
+    print(f'{"sessions":>8} {"fps/sess":>9} {"total":>7} {"dropped":>8} {"p50 ms":>7} {"p90 ms":>7} {"p99 ms":>7} {"cores":>6} {"RSS MB":>7}')
+    for n in args.sessions:
+        r = run_step(mode, n, frames, args, arduino_link)
+        print(f'{r["sessions"]:8d} {r["fps_per_session"]:9.1f} {r["throughput"]:7.1f} {r["dropped"]:8.1%} {r["p50_ms"]:7.1f} '
+              f'{r["p90_ms"]:7.1f} {r["p99_ms"]:7.1f} {r["cpu_cores"]:6.2f} {r["rss_mb"]:7.0f}')
+
+    if fake_arduino is not None:
+        print(f'Arduino received {len(fake_arduino.moves)} moves')
+        fake_arduino.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""Replays recorded videos or landmark recordings through the classification pipeline without a browser.
+
+Examples:
+    python run_replay.py clips/ --workers 4
+    python run_replay.py recordings/ --classifier distance --json replay.json
+    python run_replay.py recordings/ --shadow distance linear
+"""
+
+import argparse
+import json
+
+import config as cfg
+from helpers.classifier_ensemble import CLASSIFIERS, VOTE, missing_model
+from helpers.replay_helper import (DEFAULT_SETTINGS, evaluate_all, find_inputs,
+                                   overall_agreement)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('inputs', nargs='+', help='Video files, recorded sessions or directories containing them.')
+    parser.add_argument('--classifier', choices=list(CLASSIFIERS) + [VOTE], default=DEFAULT_SETTINGS['classifier'])
+    parser.add_argument('--model', default=cfg.CLASSIFIER_MODEL, help='Model file of the linear classifier.')
+    parser.add_argument('--members', nargs='+', choices=list(CLASSIFIERS), default=list(cfg.VOTE_CLASSIFIERS),
+                        help='Classifiers that vote with --classifier vote.')
+    parser.add_argument('--shadow', nargs='+', choices=list(CLASSIFIERS), default=[],
+                        help='Also run these classifiers on the same hands and compare them.')
+    parser.add_argument('--delta-gate', type=float, metavar='EPSILON',
+                        help='Reuse the last prediction while the landmarks moved less than this.')
+    parser.add_argument('--angle-cutoff', type=float, default=cfg.ANGLE_CUTOFF_GAME)
+    parser.add_argument('--model-complexity', type=int, default=cfg.MODEL_COMPLEXITY)
+    parser.add_argument('--min-detection-confidence', type=float, default=cfg.MIN_DETECTION_CONFIDENCE_GAME)
+    parser.add_argument('--min-tracking-confidence', type=float, default=cfg.MIN_TRACKING_CONFIDENCE_GAME)
+    parser.add_argument('--smoothing', type=float, nargs=2, metavar=('MIN_CUTOFF', 'BETA'),
+                        help='Smooth the landmarks with a One Euro filter with these settings.')
+    parser.add_argument('--workers', type=int, default=None, help='Processes in the pool (default: all cores).')
+    parser.add_argument('--max-frames', type=int, default=None, help='Stop each input after this many frames.')
+    parser.add_argument('--json', help='Also write the per-file results to this JSON file.')
+    return parser.parse_args()
+
+
+def format_ms(value):
+    return f'{value:7.2f}' if value is not None else '      -'
+
+
+def main():
+    args = parse_args()
+    settings = {
+        'classifier': args.classifier,
+        'angle_cutoff': args.angle_cutoff,
+        'model_complexity': args.model_complexity,
+        'min_detection_confidence': args.min_detection_confidence,
+        'min_tracking_confidence': args.min_tracking_confidence,
+        'smoothing': args.smoothing,
+        'model_path': args.model,
+        'members': args.members,
+        'shadow': args.shadow,
+        'delta_gate': args.delta_gate,
+    }
+    problem = missing_model(settings)
+    if problem:
+        print(problem)
+        return
+    inputs = find_inputs(args.inputs)
+    if not inputs:
+        print('No videos or recordings found!')
+        return
+
+    summaries = evaluate_all(inputs, settings, workers=args.workers, max_frames=args.max_frames)
+
+    print(f'{"file":50} {"frames":>7} {"fps":>7} {"p50 ms":>7} {"p90 ms":>7} {"p99 ms":>7} {"label":>9} {"agree":>6} {"flicker":>7}')
+    for s in summaries:
+        agreement = f'{s["agreement"]:6.1%}' if s['agreement'] is not None else '     -'
+        flicker = f'{s["flicker"]:7.1%}' if s.get('flicker') is not None else '      -'
+        print(f'{s["path"][-50:]:50} {s["frames"]:7d} {s["fps"]:7.1f} {format_ms(s["latency_p50_ms"])} '
+              f'{format_ms(s["latency_p90_ms"])} {format_ms(s["latency_p99_ms"])} {str(s["label"]):>9} {agreement} {flicker}')
+        for name, c in (s.get('classifiers') or {}).items():
+            label_agreement = f'{c["label_agreement"]:6.1%}' if c['label_agreement'] is not None else '     -'
+            print(f'{"  " + name + (" (voter)" if c["voter"] else " (shadow)"):50} {c["mean_us"] or 0:9.1f} us/hand  '
+                  f'agrees with prediction {c["agreement"] or 0:6.1%}  with label {label_agreement}')
+        if s.get('delta_gate'):
+            gate = s['delta_gate']
+            print(f'  delta gate: {gate["reused"]} reused, {gate["partial"]} partially and {gate["full"]} fully recomputed')
+
+    agreement = overall_agreement(summaries)
+    if agreement is not None:
+        print(f'Overall agreement with the labels: {agreement:.1%}')
+    live_agreement = overall_agreement(summaries, live=True)
+    if live_agreement is not None:
+        print(f'Overall agreement with the live predictions: {live_agreement:.1%}')
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'settings': settings, 'results': summaries, 'agreement': agreement,
+                       'live_agreement': live_agreement}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""Reports where cold-start time goes: module import times, and the first frame with and without warm-up.
+
+The first frame through a freshly built VideoProcessor pays for the Mediapipe graph
+initialisation. After startup_helper.warm_up (which the web app starts in the background
+at server boot) a new VideoProcessor takes a warmed detector from the pool, so its first
+frame should cost about as much as the thousandth.
+
+Examples:
+    python run_startup_profile.py
+    python run_startup_profile.py --modules run_kiosk modes --top 30 --video clips/rock/001.mp4
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--modules', nargs='+', default=['streamlit', 'streamlit_webrtc', 'modes'],
+                        help='Modules to profile the imports of.')
+    parser.add_argument('--top', type=int, default=20, help='Number of slowest imports to show.')
+    parser.add_argument('--video', help='Video to take the frames from; empty frames by default.')
+    parser.add_argument('--frames', type=int, default=100, help='Frames to time per VideoProcessor.')
+    return parser.parse_args()
+
+
+def time_frames(frames):
+    """Builds a game mode VideoProcessor and times its construction and every frame."""
+    import config as cfg
+    from classification import AngleClassifier
+    from helpers.video_helper import VideoProcessor
+
+    start = time.perf_counter()
+    video_processor = VideoProcessor(
+        classifier=AngleClassifier(angle_cutoff=cfg.ANGLE_CUTOFF_GAME),
+        model_complexity=cfg.MODEL_COMPLEXITY,
+        min_detection_confidence=cfg.MIN_DETECTION_CONFIDENCE_GAME,
+        min_tracking_confidence=cfg.MIN_TRACKING_CONFIDENCE_GAME,
+        replenish_pool=False,  # a background rebuild would compete with the timed frames
+    )
+    build = time.perf_counter() - start
+    durations = []
+    for frame in frames:
+        start = time.perf_counter()
+        video_processor.process(frame.copy())
+        durations.append(time.perf_counter() - start)
+    video_processor.close()
+    return build, durations
+
+
+def main():
+    args = parse_args()
+    from helpers.startup_helper import import_profile, warm_up
+    from run_benchmark import load_frames
+
+    profile = import_profile(args.modules)
+    print(f'Importing {", ".join(args.modules)} takes {max(row[2] for row in profile):.2f} s. Slowest imports:')
+    print(f'{"module":50} {"self ms":>8} {"total ms":>9}')
+    for name, self_time, cumulative in profile[:args.top]:
+        print(f'{name:50} {self_time * 1000:8.1f} {cumulative * 1000:9.1f}')
+
+    frames = load_frames(args.video, args.frames)
+    print(f'\n{"":10} {"build ms":>9} {"1st frame ms":>13} {"steady p50 ms":>14}')
+    build, durations = time_frames(frames)
+    print(f'{"cold":10} {build * 1000:9.1f} {durations[0] * 1000:13.1f} {np.median(durations[1:]) * 1000:14.1f}')
+
+    timings = warm_up()
+    build, durations = time_frames(frames)
+    print(f'{"warm":10} {build * 1000:9.1f} {durations[0] * 1000:13.1f} {np.median(durations[1:]) * 1000:14.1f}')
+    print(f'(warm-up took {sum(timings.values()):.2f} s: '
+          + ', '.join(f'{step} {seconds:.2f} s' for step, seconds in timings.items()) + ')')
+
+
+if __name__ == '__main__':
+    main()
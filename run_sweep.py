@@ -0,0 +1,78 @@
+"""Sweeps the AngleClassifier cutoffs over a labelled landmark dataset.
+
+The dataset is a set of recorded sessions (see RECORD_SESSIONS in config.py) with the label in
+their path, e.g. recordings/paper/<session>/. Every combination of top and bottom cutoff is
+evaluated in one vectorized pass.
+
+Example:
+    python run_sweep.py recordings/ --step 0.5 --output sweep.npz
+"""
+
+import argparse
+
+import numpy as np
+
+import config as cfg
+from classification import top_bottom_angles
+from helpers.replay_helper import LABELS
+from helpers.tuning_helper import accuracy, load_labelled_landmarks, sweep_cutoffs
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('inputs', nargs='+', help='Labelled recorded sessions or directories containing them.')
+    parser.add_argument('--min', type=float, default=0., help='Smallest cutoff in degrees.')
+    parser.add_argument('--max', type=float, default=180., help='Largest cutoff in degrees.')
+    parser.add_argument('--step', type=float, default=0.5, help='Cutoff step in degrees.')
+    parser.add_argument('--top', type=int, default=5, help='Number of best settings to list.')
+    parser.add_argument('--output', help='Write cutoffs, confusion matrices and accuracies to this .npz file.')
+    return parser.parse_args()
+
+
+def print_confusion(confusion):
+    print(f'{"":>10}' + ''.join(f'{name:>10}' for name in LABELS))
+    for name, row in zip(LABELS, confusion):
+        print(f'{name:>10}' + ''.join(f'{count:10d}' for count in row))
+
+
+def main():
+    args = parse_args()
+    landmarks, labels = load_labelled_landmarks(args.inputs)
+    if not len(labels):
+        print('No labelled recordings found! Put them in a rock/, paper/ or scissors/ folder.')
+        return
+    print(f'Loaded {len(labels)} hands: ' + ', '.join(f'{np.sum(labels == i)} {name}' for i, name in enumerate(LABELS)))
+
+    cutoffs = np.arange(args.min, args.max + args.step / 2, args.step)
+    top_angles, bottom_angles = top_bottom_angles(landmarks)
+    confusion = sweep_cutoffs(top_angles, bottom_angles, labels, cutoffs, cutoffs)
+    accuracies = accuracy(confusion)
+    print(f'Evaluated {accuracies.size} cutoff combinations')
+
+    print('\nBest separate top/bottom cutoffs:')
+    for flat_idx in np.argsort(accuracies, axis=None)[::-1][:args.top]:
+        i, j = np.unravel_index(flat_idx, accuracies.shape)
+        print(f'  top {cutoffs[i]:6.1f}  bottom {cutoffs[j]:6.1f}  accuracy {accuracies[i, j]:.2%}')
+
+    shared = np.diagonal(accuracies)
+    best_shared = int(np.argmax(shared))
+    print(f'\nBest shared cutoff (single angle_cutoff): {cutoffs[best_shared]:.1f} with accuracy {shared[best_shared]:.2%}')
+    print_confusion(confusion[best_shared, best_shared])
+
+    current = int(np.argmin(np.abs(cutoffs - cfg.ANGLE_CUTOFF_GAME)))
+    print(f'\nCurrent ANGLE_CUTOFF_GAME={cfg.ANGLE_CUTOFF_GAME}: accuracy {accuracies[current, current]:.2%}')
+    print_confusion(confusion[current, current])
+
+    i, j = np.unravel_index(np.argmax(accuracies), accuracies.shape)
+    print(f'\nBest overall: top {cutoffs[i]:.1f}, bottom {cutoffs[j]:.1f} with accuracy {accuracies[i, j]:.2%}'
+          f' (AngleClassifier(angle_cutoff={cutoffs[i]:g}, bottom_angle_cutoff={cutoffs[j]:g}))')
+    print_confusion(confusion[i, j])
+
+    if args.output:
+        np.savez_compressed(args.output, top_cutoffs=cutoffs, bottom_cutoffs=cutoffs,
+                            confusion=confusion, accuracy=accuracies, labels=np.array(LABELS))
+        print(f'Wrote sweep to {args.output}')
+
+
+if __name__ == '__main__':
+    main()
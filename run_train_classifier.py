@@ -0,0 +1,85 @@
+"""Trains the linear landmark classifier (CLASSIFIER='linear' in config.py).
+
+The training data are labelled recorded sessions (see RECORD_SESSIONS in config.py) with the label in
+their path, e.g. recordings/paper/<session>/, and/or synthetic hands. A held-out part of the hands is
+used to compare the trained model with the AngleClassifier.
+
+Examples:
+    python run_train_classifier.py recordings/
+    python run_train_classifier.py --synthetic 20000 --output models/synthetic.npz
+"""
+
+import argparse
+import os
+import time
+
+import numpy as np
+
+import config as cfg
+from classification import AngleClassifier, top_bottom_angles
+from helpers.replay_helper import LABELS
+from helpers.tuning_helper import (accuracy, confusion_matrix, load_labelled_landmarks,
+                                   train_linear_classifier)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('inputs', nargs='*', help='Labelled recorded sessions or directories containing them.')
+    parser.add_argument('--synthetic', type=int, default=0, help='Add this many synthetic hands.')
+    parser.add_argument('--holdout', type=float, default=0.2, help='Fraction of the hands used for testing.')
+    parser.add_argument('--l2', type=float, default=1e-3, help='Weight decay.')
+    parser.add_argument('--steps', type=int, default=1000, help='Gradient descent steps.')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default=cfg.CLASSIFIER_MODEL, help='Where to write the model.')
+    return parser.parse_args()
+
+
+def print_confusion(confusion):
+    print(f'{"":>10}' + ''.join(f'{name:>10}' for name in LABELS))
+    for name, row in zip(LABELS, confusion):
+        print(f'{name:>10}' + ''.join(f'{count:10d}' for count in row))
+
+
+def main():
+    args = parse_args()
+    landmarks, labels = load_labelled_landmarks(args.inputs)
+    if args.synthetic:
+        from helpers.synthetic_hands import HandGenerator
+
+        synthetic, synthetic_labels = HandGenerator(seed=args.seed).generate(args.synthetic)
+        landmarks = np.concatenate([landmarks, synthetic])
+        labels = np.concatenate([labels, synthetic_labels])
+    if not len(labels):
+        print('No labelled hands! Put recordings in a rock/, paper/ or scissors/ folder or use --synthetic.')
+        return
+    print(f'Loaded {len(labels)} hands: ' + ', '.join(f'{np.sum(labels == i)} {name}' for i, name in enumerate(LABELS)))
+
+    order = np.random.default_rng(args.seed).permutation(len(labels))
+    n_test = int(len(order) * args.holdout)
+    test, train = order[:n_test], order[n_test:]
+
+    start = time.perf_counter()
+    classifier = train_linear_classifier(landmarks[train], labels[train], l2=args.l2, steps=args.steps)
+    print(f'Trained on {len(train)} hands in {time.perf_counter() - start:.1f} s')
+
+    if n_test:
+        predicted = classifier.predict_proba(landmarks[test]).argmax(axis=-1)
+        confusion = confusion_matrix(labels[test], predicted)
+        print(f'\nLinear classifier on {n_test} held-out hands: accuracy {accuracy(confusion):.2%}')
+        print_confusion(confusion)
+
+        angle_classifier = AngleClassifier(angle_cutoff=cfg.ANGLE_CUTOFF_GAME)
+        angle_predicted = [LABELS.index(angle_classifier.classify_angles(top, bottom))
+                           for top, bottom in zip(*top_bottom_angles(landmarks[test]))]
+        confusion = confusion_matrix(labels[test], angle_predicted)
+        print(f'\nAngleClassifier(angle_cutoff={cfg.ANGLE_CUTOFF_GAME}) on the same hands: accuracy {accuracy(confusion):.2%}')
+        print_confusion(confusion)
+
+    if os.path.dirname(args.output):
+        os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    classifier.save(args.output)
+    print(f'\nWrote {args.output}')
+
+
+if __name__ == '__main__':
+    main()
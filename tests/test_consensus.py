@@ -0,0 +1,30 @@
+from helpers.consensus import Consensus
+
+
+def test_commits_when_k_of_n_agree():
+    consensus = Consensus(k=3, n=5, min_margin=5.)
+    assert consensus.update('rock', 10.) is None
+    assert consensus.update('paper', 10.) is None
+    assert consensus.update('rock', 10.) is None
+    assert consensus.update('rock', 10.) == 'rock'
+
+
+def test_low_margin_predictions_do_not_count():
+    consensus = Consensus(k=2, n=3, min_margin=5.)
+    consensus.update('rock', 1.)
+    assert consensus.update('rock', 10.) is None
+    assert consensus.update('rock', 10.) == 'rock'
+
+
+def test_window_forgets_old_predictions():
+    consensus = Consensus(k=2, n=2, min_margin=0.)
+    consensus.update('rock', 1.)
+    consensus.update('paper', 1.)
+    assert consensus.update('scissors', 1.) is None
+
+
+def test_reset():
+    consensus = Consensus(k=2, n=3, min_margin=0.)
+    consensus.update('rock', 1.)
+    consensus.reset()
+    assert consensus.update('rock', 1.) is None
@@ -0,0 +1,67 @@
+import numpy as np
+
+from classification import AngleClassifier, HandFeatures
+from helpers.delta_gate import DeltaGate
+from helpers.synthetic_hands import HandGenerator
+
+
+class CountingClassifier(object):
+    def __init__(self):
+        self.classifier = AngleClassifier()
+        self.hands = []
+
+    def predict_hand(self, hand):
+        self.hands.append(hand)
+        return self.classifier.predict_hand(hand)
+
+
+def gate_and_hand():
+    classifier = CountingClassifier()
+    gate = DeltaGate(classifier, epsilon=0.004)
+    hand = HandGenerator(seed=0).generate(1)[0][0].astype(np.float64)
+    return gate, classifier, hand
+
+
+def moved(hand, landmarks, offset=0.01):
+    hand = hand.copy()
+    hand[landmarks, 0] += offset
+    return hand
+
+
+def test_still_hand_is_reused():
+    gate, classifier, hand = gate_and_hand()
+    first = gate.predict_hand(HandFeatures(hand))
+    assert gate.predict_hand(HandFeatures(moved(hand, [8], offset=0.001))) is first
+    assert gate.counts == {'reused': 1, 'partial': 0, 'full': 1}
+    assert len(classifier.hands) == 1
+
+
+def test_unused_landmark_is_reused():
+    gate, classifier, hand = gate_and_hand()
+    first = gate.predict_hand(HandFeatures(hand))
+    assert gate.predict_hand(HandFeatures(moved(hand, [7]))) is first  # index DIP, not a knuckle angle
+    assert gate.counts['reused'] == 1
+
+
+def test_moved_finger_is_partially_recomputed():
+    gate, classifier, hand = gate_and_hand()
+    gate.predict_hand(HandFeatures(hand))
+    hand = moved(hand, [8])
+    gate.predict_hand(HandFeatures(hand))
+    assert gate.counts == {'reused': 0, 'partial': 1, 'full': 1}
+    np.testing.assert_allclose(classifier.hands[-1].finger_angles, HandFeatures(hand).finger_angles)
+
+
+def test_moved_wrist_is_fully_recomputed():
+    gate, classifier, hand = gate_and_hand()
+    gate.predict_hand(HandFeatures(hand))
+    gate.predict_hand(HandFeatures(moved(hand, [0])))
+    assert gate.counts == {'reused': 0, 'partial': 0, 'full': 2}
+
+
+def test_reset_forgets_the_hand():
+    gate, classifier, hand = gate_and_hand()
+    gate.predict_hand(HandFeatures(hand))
+    gate.reset()
+    gate.predict_hand(HandFeatures(hand))
+    assert gate.counts == {'reused': 0, 'partial': 0, 'full': 2}
@@ -0,0 +1,35 @@
+from helpers.game_state import (ALERT, ANNOTATE, COUNTDOWN, FREEZE, IDLE, PLAY,
+                                FreestyleState, GameState)
+
+
+def test_countdown_then_play():
+    state = GameState(start=0., count_from=3, delay=3, too_fast_delay=1)
+    assert state.step(0.) == (COUNTDOWN, 3, None)
+    assert state.step(1.) == (COUNTDOWN, 2, None)
+    assert state.step(2.5).kind == IDLE
+    assert state.step(2.6, 'rock') == (PLAY, None, b'P')
+
+
+def test_frozen_after_play():
+    state = GameState(start=0., count_from=3, delay=3)
+    state.step(2.5, 'scissors')
+    assert state.step(4., 'paper').kind == FREEZE
+    assert not state.wants_detection(4.)
+    assert state.step(5.6).kind == COUNTDOWN  # delay over, the next countdown runs
+
+
+def test_hand_during_countdown_raises_alert():
+    state = GameState(start=0., count_from=3, too_fast_delay=1)
+    assert state.step(0.5, 'paper').kind == ALERT
+    assert state.step(1.).kind == ALERT  # alert shown for too_fast_delay
+    assert not state.wants_detection(1.)
+    assert state.step(1.6).kind == COUNTDOWN  # countdown restarted
+
+
+def test_freestyle_sends_changed_hands_after_cache_time():
+    state = FreestyleState(cache_time=0.5)
+    assert state.step(0.).kind == IDLE
+    assert state.step(0., 'rock') == (ANNOTATE, None, b'P')
+    assert state.step(0.1, 'paper') == (ANNOTATE, None, None)  # within cache_time
+    assert state.step(1., 'rock') == (ANNOTATE, None, None)  # same hand as the last move
+    assert state.step(1., 'paper') == (ANNOTATE, None, b'S')
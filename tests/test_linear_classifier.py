@@ -0,0 +1,19 @@
+import numpy as np
+
+from classification import N_FEATURES, LinearClassifier
+from helpers.synthetic_hands import HandGenerator
+
+
+def test_save_load_round_trip(tmp_path):
+    rng = np.random.default_rng(0)
+    classifier = LinearClassifier(rng.normal(size=(N_FEATURES, 3)), rng.normal(size=3),
+                                  rng.normal(size=N_FEATURES), rng.uniform(0.5, 2., size=N_FEATURES),
+                                  labels=('paper', 'rock', 'scissors'))
+    path = str(tmp_path / 'model.npz')
+    classifier.save(path)
+    loaded = LinearClassifier.load(path)
+
+    assert loaded.labels == classifier.labels
+    hands = HandGenerator(seed=0).generate(10)[0]
+    np.testing.assert_allclose(loaded.predict_proba(hands), classifier.predict_proba(hands))
+    assert loaded.predict(hands[0]) == classifier.predict(hands[0])
@@ -0,0 +1,47 @@
+from helpers.quality_controller import QualityController
+
+LEVELS = [{'model_complexity': 1}, {'model_complexity': 0}, {'model_complexity': 0, 'frame_skip': 1}]
+
+
+class FakeProcessor(object):
+    def __init__(self):
+        self.swap_pending = False
+        self.settings = []
+
+    def set_quality(self, **settings):
+        self.settings.append(settings)
+        self.swap_pending = 'model_complexity' in settings
+
+
+def feed(controller, processor, latency, frames):
+    for _ in range(frames):
+        controller.update(processor, latency)
+
+
+def test_steps_down_when_over_budget():
+    controller, processor = QualityController(LEVELS, latency_budget=0.05, patience_down=15), FakeProcessor()
+    feed(controller, processor, 0.1, 15)
+    assert controller.level == 1
+    assert processor.settings == [LEVELS[1]]
+
+
+def test_waits_for_the_swap_and_the_cooldown_before_the_next_step():
+    controller = QualityController(LEVELS, latency_budget=0.05, patience_down=15, cooldown=30)
+    processor = FakeProcessor()
+    feed(controller, processor, 0.1, 15)
+    feed(controller, processor, 0.1, 100)  # the new detector is still being built
+    assert controller.level == 1
+    processor.swap_pending = False
+    feed(controller, processor, 0.1, 30 + 14)
+    assert controller.level == 1
+    assert controller.update(processor, 0.1)
+    assert controller.level == 2
+
+
+def test_new_level_is_judged_on_its_own_latency():
+    controller = QualityController(LEVELS, latency_budget=0.05, patience_down=15, cooldown=0)
+    processor = FakeProcessor()
+    feed(controller, processor, 1., 15)
+    processor.swap_pending = False
+    feed(controller, processor, 0.04, 100)  # within budget right away, despite the slow past
+    assert controller.level == 1